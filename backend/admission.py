@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Priority admission control for concurrent chat turns
+
+Under a spike, turns used to wait in arrival order, so a HIGH-risk message
+could sit behind small talk. The controller admits at most max_active
+turns at once. The rest wait in a priority queue ordered by the cheap
+crisis pre-check (HIGH, then MODERATE, then LOW; arrival order within a
+level). Once shed_queue_depth turns are waiting, new LOW-risk turns are
+turned away at once so the caller can answer with a supportive fallback.
+HIGH and MODERATE turns are never shed.
+
+Lives on one event loop and is not thread-safe.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from latency_metrics import StageLatencyRecorder
+
+PRIORITIES = {'HIGH': 0, 'MODERATE': 1, 'LOW': 2}
+SHEDDABLE_LEVELS = ('LOW',)
+
+
+class Shed(Exception):
+    """Raised by admit() when a turn is turned away instead of queued"""
+
+
+class AdmissionController:
+    def __init__(self, max_active, shed_queue_depth):
+        self.max_active = max_active
+        self.shed_queue_depth = shed_queue_depth
+
+        self.active = 0
+        # [priority, arrival, future]; a released slot goes to the head
+        self._queue = []
+        self._arrivals = itertools.count()
+
+        self.admitted = {level: 0 for level in PRIORITIES}
+        self.shed = {level: 0 for level in PRIORITIES}
+        self.wait = StageLatencyRecorder()
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    async def admit(self, risk_level):
+        """
+        Wait for a slot and return the milliseconds spent queued. Raises
+        Shed for a sheddable level when the queue is already too deep.
+        Every successful admit() must be paired with release().
+        """
+        start = time.perf_counter()
+        level = risk_level if risk_level in PRIORITIES else 'LOW'
+
+        if self.active < self.max_active and not self._queue:
+            self.active += 1
+            return self._admitted(level, start)
+
+        if level in SHEDDABLE_LEVELS and len(self._queue) >= self.shed_queue_depth:
+            self.shed[level] += 1
+            raise Shed(f"{len(self._queue)} turns queued")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [PRIORITIES[level], next(self._arrivals), future]
+        heapq.heappush(self._queue, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Gave up while queued (e.g. the client disconnected)
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+            else:
+                # A slot was handed over just as we were cancelled
+                self.release()
+            raise
+        return self._admitted(level, start)
+
+    def release(self):
+        """Hand the slot to the highest-priority waiter, or free it"""
+        while self._queue:
+            future = heapq.heappop(self._queue)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _admitted(self, level, start):
+        waited_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.admitted[level] += 1
+        self.wait.record({level: waited_ms})
+        return waited_ms
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'queue_depth': len(self._queue),
+            'admitted': dict(self.admitted),
+            'shed': dict(self.shed),
+            'wait': self.wait.snapshot()
+        }
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+AgentCore Runtime HTTP server for the Mental Health Agent
+
+Serves the runtime container contract on port 8080: GET /ping for health
+checks and POST /invocations for chat turns. One asyncio event loop owns
+every connection (HTTP/1.1 with keep-alive) and hands each turn to a
+bounded thread pool, because the agent's boto3 calls block. The loop
+itself never waits on AWS, so one process serves hundreds of sessions at
+once where the Lambda handler serves one. With SERVER_WORKERS the server
+runs as several pre-forked processes sharing one socket (see prefork.py);
+per-session state is then per worker, with no session affinity.
+
+A turn streams as Server-Sent Events over chunked transfer encoding when
+the request asks for it ({"stream": true} or Accept: text/event-stream),
+with the same frames the Lambda handler produces; tokens are written as
+Bedrock returns them.
+
+Turns are admitted by risk (see admission.py): the crisis pre-check runs
+on the loop, HIGH and MODERATE turns queue ahead of LOW ones, and when
+the queue is deep LOW turns get a supportive "busy" reply at once. Before
+that, turns of one session wait on the loop for the previous one to
+finish (see session_lock.py), so a chatty session never ties up slots
+other sessions could use.
+"""
+
+import asyncio
+import os
+import signal
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+
+import fast_json
+from admission import AdmissionController, Shed
+from deadline import RESPONSE_MARGIN_SECONDS, Deadline
+from latency_metrics import emit_emf
+from mental_health_agent_with_memory import (CORS_HEADERS, DEFAULT_ALERT_OUTBOX_DIR, DEFAULT_EVENT_SPOOL_DIR,
+                                             INTERNAL_ERROR_BODY, NO_INPUT_BODY, STREAM_HEADERS,
+                                             build_response_payload, elapsed_ms, format_sse, get_agent,
+                                             iter_sse_events, preload_for_fork, record_handler_timings,
+                                             reset_after_fork, timed_headers, wants_stream)
+from prefork import PreforkSupervisor, available_cpus, bind_socket
+from session_lock import AsyncSessionLocks
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+# Set by the runtime on every invocation; used when the body has no sessionId
+SESSION_HEADER = 'x-amzn-bedrock-agentcore-runtime-session-id'
+
+JSON_HEADERS = {**CORS_HEADERS, 'Content-Type': 'application/json'}
+STREAM_ERROR_FRAME = format_sse('error', {
+    'message': 'I apologize, but I am having technical difficulties. If you are in crisis, please contact emergency services immediately.'
+})
+
+# Sent instead of a generated reply when a LOW-risk turn is shed
+BUSY_RESPONSE = ("Thank you for reaching out - I want to give you my full attention, and a lot of people are "
+                 "talking with me right now. Could you send your message again in a minute or two? If things "
+                 "feel urgent or unsafe, please contact a crisis line or emergency services right away.")
+
+_STREAM_END = object()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    __slots__ = ('method', 'path', 'version', 'headers', 'body')
+
+    def __init__(self, method, path, version, headers, body):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+
+async def read_request(reader):
+    """Parse one request off a connection; None once the client has closed it"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(HTTPStatus.BAD_REQUEST, 'Incomplete request')
+    except asyncio.LimitOverrunError:
+        raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, 'Request headers too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, 'Malformed request line')
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HttpError(HTTPStatus.LENGTH_REQUIRED, 'Chunked request bodies are not supported')
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Request body too large')
+    body = await reader.readexactly(length) if length else b''
+
+    return Request(method.upper(), target.split('?', 1)[0], version, headers, body)
+
+
+def response_head(status, headers, keep_alive, content_length=None):
+    """Status line and headers; without content_length the body is chunked"""
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    if content_length is None:
+        lines.append('Transfer-Encoding: chunked')
+    else:
+        lines.append(f"Content-Length: {content_length}")
+    lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+class AgentCoreServer:
+    def __init__(self, agent=None, max_concurrency=64, keepalive_seconds=75.0, invocation_timeout_seconds=60.0,
+                 shed_queue_depth=128):
+        """
+        max_concurrency: turns running at once; each holds one executor
+        thread for its duration. Later requests wait on the loop, which
+        costs nothing but a coroutine, until shed_queue_depth are waiting;
+        after that LOW-risk turns are shed.
+        """
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+        self.keepalive_seconds = keepalive_seconds
+        self.invocation_timeout_seconds = invocation_timeout_seconds
+
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='invocation')
+        self.admission = AdmissionController(max_concurrency, shed_queue_depth)
+        self.session_turns = AsyncSessionLocks()
+        self.server = None
+        self.draining = False
+        # Connections waiting for their next request, closed first on drain
+        self._idle_writers = set()
+
+        self.connections = 0
+        self.invocations = 0
+        self.last_update = time.time()
+
+    async def start(self, host='0.0.0.0', port=8080, sock=None):
+        """Build the agent and listen on host:port, or on an already bound socket"""
+        if self.agent is None:
+            self.agent = await asyncio.get_running_loop().run_in_executor(self.executor, get_agent)
+        if sock is not None:
+            self.server = await asyncio.start_server(self._handle_connection, sock=sock, limit=MAX_HEADER_BYTES)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port,
+                                                     limit=MAX_HEADER_BYTES, backlog=1024)
+        addresses = ', '.join(str(s.getsockname()) for s in self.server.sockets)
+        print(f"🌐 AgentCore server listening on {addresses} (max {self.max_concurrency} concurrent turns)")
+        return self.server
+
+    async def serve_forever(self, host='0.0.0.0', port=8080, sock=None, grace_seconds=30.0):
+        """Serve until SIGTERM/SIGINT, then drain and flush the agent"""
+        await self.start(host, port, sock)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        await stop.wait()
+        await self.drain(grace_seconds)
+        await loop.run_in_executor(None, self.agent.close)
+
+    async def drain(self, grace_seconds=30.0):
+        """
+        Stop accepting, close idle keep-alive connections and let in-flight
+        and queued turns finish, for at most grace_seconds
+        """
+        self.draining = True
+        self.server.close()
+        for writer in list(self._idle_writers):
+            writer.close()
+        admission = self.admission
+        print(f"🛑 Draining: {admission.active} active, {admission.depth} queued turns")
+
+        # Turns waiting behind their session are in neither count yet
+        deadline = time.monotonic() + grace_seconds
+        while self.session_turns.turns() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.session_turns.turns():
+            print(f"⚠️ Drain timed out with {admission.active} active, {admission.depth} queued turns")
+        else:
+            print(f"✅ Drained after {self.invocations} invocations")
+
+    # Connections
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while not self.draining:
+                self._idle_writers.add(writer)
+                try:
+                    request = await asyncio.wait_for(read_request(reader), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    await self._send(writer, e.status, fast_json.dumps({'error': str(e)}), keep_alive=False)
+                    break
+                finally:
+                    self._idle_writers.discard(writer)
+                if request is None:
+                    break
+                if not await self._dispatch(request, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _send(self, writer, status, body, headers=JSON_HEADERS, keep_alive=True):
+        payload = body.encode('utf-8') if isinstance(body, str) else body
+        writer.write(response_head(status, headers, keep_alive, len(payload)) + payload)
+        await writer.drain()
+        return keep_alive
+
+    async def _dispatch(self, request, writer):
+        """Handle one request; returns whether the connection stays open"""
+        keep_alive = request.keep_alive and not self.draining
+        if request.path == '/ping' and request.method == 'GET':
+            return await self._send(writer, HTTPStatus.OK, fast_json.dumps(self.ping()), keep_alive=keep_alive)
+        if request.method == 'OPTIONS':
+            return await self._send(writer, HTTPStatus.OK, b'', CORS_HEADERS, keep_alive)
+        if request.path == '/invocations':
+            if request.method != 'POST':
+                return await self._send(writer, HTTPStatus.METHOD_NOT_ALLOWED,
+                                        fast_json.dumps({'error': 'Use POST'}), keep_alive=keep_alive)
+            return await self._invoke(request, writer, keep_alive)
+        return await self._send(writer, HTTPStatus.NOT_FOUND, fast_json.dumps({'error': 'Not found'}),
+                                keep_alive=keep_alive)
+
+    def ping(self):
+        """Runtime health: HealthyBusy while every turn slot is taken"""
+        return {
+            'status': 'HealthyBusy' if self.admission.active >= self.max_concurrency else 'Healthy',
+            'time_of_last_update': int(self.last_update)
+        }
+
+    # Invocations
+
+    async def _invoke(self, request, writer, keep_alive):
+        handler_start = time.perf_counter()
+        deadline = Deadline(max(self.invocation_timeout_seconds - RESPONSE_MARGIN_SECONDS, 0.0))
+        loop = asyncio.get_running_loop()
+
+        try:
+            body = fast_json.loads(request.body or b'{}')
+        except ValueError:
+            return await self._send(writer, HTTPStatus.BAD_REQUEST,
+                                    fast_json.dumps({'error': 'Body must be JSON'}), keep_alive=keep_alive)
+        if not isinstance(body, dict):
+            return await self._send(writer, HTTPStatus.BAD_REQUEST,
+                                    fast_json.dumps({'error': 'Body must be a JSON object'}), keep_alive=keep_alive)
+        user_input = body.get('input', '')
+        if not isinstance(user_input, str):
+            return await self._send(writer, HTTPStatus.BAD_REQUEST,
+                                    fast_json.dumps({'error': 'input must be a string'}), keep_alive=keep_alive)
+        session_id = body.get('sessionId') or request.headers.get(SESSION_HEADER) or str(uuid.uuid4())
+        actor_id = body.get('actorId') or body.get('userId') or 'anonymous_user'
+        if not isinstance(session_id, str) or not isinstance(actor_id, str):
+            return await self._send(writer, HTTPStatus.BAD_REQUEST,
+                                    fast_json.dumps({'error': 'sessionId and actorId must be strings'}),
+                                    keep_alive=keep_alive)
+        timings = {'parse': elapsed_ms(handler_start)}
+
+        if body.get('action') == 'end_session':
+            await loop.run_in_executor(self.executor, self.agent.end_session, actor_id, session_id)
+            return await self._send(writer, HTTPStatus.OK,
+                                    fast_json.dumps({'sessionId': session_id, 'sessionEnded': True}),
+                                    keep_alive=keep_alive)
+        if not user_input:
+            return await self._send(writer, HTTPStatus.BAD_REQUEST, NO_INPUT_BODY, keep_alive=keep_alive)
+
+        stream = wants_stream(request.headers, body)
+
+        # A session's turns run one at a time, in arrival order. Waiting
+        # happens here, before admission, so it holds no turn slot or thread.
+        wait_timeout = deadline.budget_for(self.agent.session_wait_seconds, self.agent.generation_reserve_seconds)
+        async with self.session_turns.hold((actor_id, session_id), wait_timeout) as waited_ms:
+            if waited_ms:
+                timings['session_wait'] = waited_ms
+            return await self._admit_turn(writer, keep_alive, stream, user_input, actor_id, session_id,
+                                          deadline, handler_start, timings)
+
+    async def _admit_turn(self, writer, keep_alive, stream, user_input, actor_id, session_id, deadline,
+                          handler_start, timings):
+        loop = asyncio.get_running_loop()
+
+        # Cheap lexicon scan on the loop decides the turn's place in line
+        risk_level = self.agent.detect_crisis(user_input)['risk_level']
+        try:
+            timings['queue'] = await self.admission.admit(risk_level)
+        except Shed:
+            self._record_admission(risk_level, shed=True)
+            print(f"🚦 Shed {risk_level} turn for {actor_id} ({self.admission.depth} queued)")
+            return await self._send(writer, HTTPStatus.OK, self._busy_body(actor_id, session_id),
+                                    keep_alive=keep_alive)
+        self._record_admission(risk_level, waited_ms=timings['queue'])
+        self.invocations += 1
+        self.last_update = time.time()
+        try:
+            if stream:
+                return await self._stream_turn(writer, keep_alive, user_input, actor_id, session_id,
+                                               deadline, handler_start, timings)
+            try:
+                result = await loop.run_in_executor(self.executor, self.agent.chat_with_memory,
+                                                    user_input, actor_id, session_id, deadline)
+                response_body = fast_json.dumps(build_response_payload(result))
+                headers = timed_headers(JSON_HEADERS, result['stage_timings'], handler_start, timings,
+                                        'agentcore-server', self.agent)
+            except Exception as e:
+                print(f"❌ Error: {str(e)}")
+                return await self._send(writer, HTTPStatus.INTERNAL_SERVER_ERROR, INTERNAL_ERROR_BODY,
+                                        keep_alive=keep_alive)
+            return await self._send(writer, HTTPStatus.OK, response_body, headers, keep_alive)
+        finally:
+            self.last_update = time.time()
+            self.admission.release()
+
+    async def _stream_turn(self, writer, keep_alive, user_input, actor_id, session_id, deadline,
+                           handler_start, timings):
+        """
+        Run the streaming turn on the executor and write its SSE frames as
+        they arrive. If the client goes away the turn still finishes (so the
+        reply is stored) and its slot is only released afterwards.
+        """
+        loop = asyncio.get_running_loop()
+        frames = asyncio.Queue()
+
+        def produce():
+            try:
+                for frame in iter_sse_events(self.agent, user_input, actor_id, session_id, deadline=deadline):
+                    loop.call_soon_threadsafe(frames.put_nowait, frame)
+            except Exception as e:
+                print(f"❌ Stream error: {str(e)}")
+                loop.call_soon_threadsafe(frames.put_nowait, STREAM_ERROR_FRAME)
+            finally:
+                loop.call_soon_threadsafe(frames.put_nowait, _STREAM_END)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        connected = True
+        try:
+            writer.write(response_head(HTTPStatus.OK, STREAM_HEADERS, keep_alive))
+            while True:
+                frame = await frames.get()
+                if frame is _STREAM_END:
+                    break
+                if not connected:
+                    continue
+                data = frame.encode('utf-8')
+                writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    connected = False
+            if connected:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+        finally:
+            await producer
+            record_handler_timings(timings, handler_start, 'agentcore-server', self.agent)
+        return connected and keep_alive
+
+    def _busy_body(self, actor_id, session_id):
+        return fast_json.dumps({
+            'response': BUSY_RESPONSE,
+            'sessionId': session_id,
+            'actorId': actor_id,
+            'crisisDetected': False,
+            'riskLevel': 'LOW',
+            'shed': True,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    # Metrics
+
+    def _record_admission(self, risk_level, waited_ms=0.0, shed=False):
+        """Queue wait, queue depth and sheds per risk level, as EMF"""
+        if self.agent.emit_metrics:
+            emit_emf({'queue_wait': waited_ms, 'queue_depth': self.admission.depth, 'shed': int(shed)},
+                     self.agent.metrics_namespace, {'Service': 'admission', 'RiskLevel': risk_level},
+                     {'queue_depth': 'Count', 'shed': 'Count'})
+
+    def stats(self):
+        return {
+            'connections': self.connections,
+            'invocations': self.invocations,
+            'admission': self.admission.stats(),
+            'sessions': self.session_turns.stats()
+        }
+
+
+def build_server():
+    max_concurrency = int(os.environ.get('SERVER_MAX_CONCURRENCY', '64'))
+    # Size the agent's pools and boto3's connection pools for this many
+    # concurrent turns unless they are configured explicitly
+    os.environ.setdefault('STAGE_WORKERS', str(2 * max_concurrency))
+    os.environ.setdefault('MEMORY_READ_WORKERS', str(2 * max_concurrency))
+    os.environ.setdefault('AWS_MAX_POOL_CONNECTIONS', str(max_concurrency + 16))
+
+    return AgentCoreServer(
+        max_concurrency=max_concurrency,
+        keepalive_seconds=float(os.environ.get('SERVER_KEEPALIVE_SECONDS', '75')),
+        invocation_timeout_seconds=float(os.environ.get('INVOCATION_TIMEOUT_SECONDS', '60')),
+        shed_queue_depth=int(os.environ.get('SHED_QUEUE_DEPTH', str(2 * max_concurrency)))
+    )
+
+
+def run_worker(index, sock):
+    """One pre-forked worker: its own spool, outbox, agent and event loop"""
+    reset_after_fork()
+    for variable, default in (('EVENT_SPOOL_DIR', DEFAULT_EVENT_SPOOL_DIR),
+                              ('ALERT_OUTBOX_DIR', DEFAULT_ALERT_OUTBOX_DIR)):
+        os.environ[variable] = os.path.join(os.environ.get(variable, default), f'worker-{index}')
+    asyncio.run(build_server().serve_forever(sock=sock, grace_seconds=drain_seconds()))
+
+
+def drain_seconds():
+    return float(os.environ.get('SERVER_DRAIN_SECONDS', '30'))
+
+
+def main():
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', '8080'))
+    # 0 means one worker per available CPU
+    workers = int(os.environ.get('SERVER_WORKERS', '1')) or available_cpus()
+
+    if workers == 1:
+        asyncio.run(build_server().serve_forever(host, port, grace_seconds=drain_seconds()))
+        return
+
+    print(f"⚠️ {workers} workers without session affinity: turn ordering and session caches are per worker")
+    preload_for_fork()
+    supervisor = PreforkSupervisor(run_worker, workers, bind_socket(host, port),
+                                   grace_seconds=drain_seconds() + 5)
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
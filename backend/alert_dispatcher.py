@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Background crisis alert dispatcher
+
+Alerts must never delay the reply to a user in crisis, and must never be
+lost. dispatch() writes the alert to a local outbox and returns; a worker
+thread delivers it, retrying with exponential backoff until the send
+succeeds. Outbox files left by a dispatcher that crashed or was closed
+are re-sent, once, by the next dispatcher started on that directory. The
+outbox lives in local storage and does not outlive the environment, so
+hosts that freeze or recycle it (Lambda) call flush() before returning,
+giving each alert due one attempt rather than waiting out its backoff.
+
+Within a window per actor and session, a message with any indicator not
+yet alerted is sent straight away. Only exact repeats (every indicator
+already alerted) are merged, into one follow-up sent when the window
+closes.
+"""
+
+import atexit
+import heapq
+import itertools
+import json
+import threading
+import time
+import uuid
+
+from spool import Spool
+
+
+class CrisisAlertDispatcher:
+    def __init__(self, deliver_func, outbox_dir, dedup_window_seconds=900,
+                 base_backoff_seconds=1.0, max_backoff_seconds=300.0):
+        """
+        deliver_func(alert) sends one alert record and raises on failure.
+        An alert record is a dict with actor_id, session_id, risk_level,
+        indicators, messages (list of {message, timestamp}) and followup.
+        """
+        self.deliver_func = deliver_func
+        self.outbox_dir = outbox_dir
+        self.dedup_window_seconds = dedup_window_seconds
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        # Min-heap of (ready_at, seq, alert_id) plus the records themselves
+        self._ready = []
+        self._alerts = {}
+        self._sequence = itertools.count()
+        self._windows = {}
+        self._delivering = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.sent = 0
+        self.coalesced = 0
+        self.failures = 0
+
+        self.outbox = Spool(outbox_dir)
+        self._replay_outbox()
+
+        self._worker = threading.Thread(target=self._run, name='crisis-alerts', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    # Outbox
+
+    def _persist(self, alert):
+        self.outbox.write(alert['id'], alert)
+
+    def _discard(self, alert):
+        self.outbox.remove(alert['id'])
+
+    def _replay_outbox(self):
+        """Re-send alerts a crashed or closed dispatcher never delivered"""
+        alerts = self.outbox.claim_orphans('outbox alert')
+        for alert in alerts:
+            self._schedule(alert, time.time())
+        if alerts:
+            print(f"📮 Re-sending {len(alerts)} undelivered crisis alerts from outbox")
+
+    # Producer side
+
+    def dispatch(self, actor_id, session_id, user_message, risk_assessment):
+        """Queue an alert and return immediately: 'queued' or 'coalesced'"""
+        now = time.time()
+        key = (actor_id, session_id)
+        entry = {'message': user_message, 'timestamp': risk_assessment['timestamp']}
+
+        with self._cond:
+            self._prune_windows(now)
+            window = self._windows.get(key)
+            if window is None or now - window['opened_at'] >= self.dedup_window_seconds:
+                window = self._windows[key] = {'opened_at': now, 'alerted': set(), 'followup_id': None}
+                new_indicators = True
+            else:
+                new_indicators = not window['alerted'].issuperset(risk_assessment['indicators'])
+
+            if new_indicators:
+                alert = self._new_alert(actor_id, session_id, risk_assessment, entry, followup=False)
+                window['alerted'].update(risk_assessment['indicators'])
+                self._persist(alert)
+                self._schedule(alert, now)
+                return 'queued'
+
+            self.coalesced += 1
+            followup = self._alerts.get(window['followup_id'])
+            if followup is None:
+                followup = self._new_alert(actor_id, session_id, risk_assessment, entry, followup=True)
+                window['followup_id'] = followup['id']
+                self._persist(followup)
+                self._schedule(followup, window['opened_at'] + self.dedup_window_seconds)
+            else:
+                followup['messages'].append(entry)
+                followup['indicators'] = list(dict.fromkeys(
+                    followup['indicators'] + risk_assessment['indicators']))
+                self._persist(followup)
+            return 'coalesced'
+
+    def _prune_windows(self, now):
+        """Forget closed windows whose follow-up (if any) has been picked up"""
+        expired = [key for key, window in self._windows.items()
+                   if now - window['opened_at'] >= self.dedup_window_seconds
+                   and window['followup_id'] is None]
+        for key in expired:
+            del self._windows[key]
+
+    def _new_alert(self, actor_id, session_id, risk_assessment, entry, followup):
+        return {
+            'id': uuid.uuid4().hex,
+            'actor_id': actor_id,
+            'session_id': session_id,
+            'risk_level': risk_assessment['risk_level'],
+            'indicators': list(risk_assessment['indicators']),
+            'messages': [entry],
+            'followup': followup,
+            'attempts': 0
+        }
+
+    def _schedule(self, alert, ready_at):
+        """Callers either hold self._cond or are still in __init__"""
+        self._alerts[alert['id']] = alert
+        heapq.heappush(self._ready, (ready_at, next(self._sequence), alert['id']))
+        if hasattr(self, '_worker'):
+            # Wakes flush() callers as well as the worker
+            self._cond.notify_all()
+
+    # Worker side
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    if self._ready and self._ready[0][0] <= time.time():
+                        _, _, alert_id = heapq.heappop(self._ready)
+                        alert = self._alerts.pop(alert_id)
+                        # Merges into a follow-up stop once it is picked up
+                        for window in self._windows.values():
+                            if window['followup_id'] == alert_id:
+                                window['followup_id'] = None
+                        snapshot = json.loads(json.dumps(alert))
+                        self._delivering += 1
+                        break
+                    timeout = self._ready[0][0] - time.time() if self._ready else None
+                    self._cond.wait(timeout)
+
+            self._deliver(snapshot)
+
+    def _deliver(self, alert):
+        try:
+            self.deliver_func(alert)
+        except Exception as e:
+            alert['attempts'] += 1
+            backoff = min(self.base_backoff_seconds * (2 ** (alert['attempts'] - 1)),
+                          self.max_backoff_seconds)
+            print(f"⚠️ Crisis alert delivery failed (attempt {alert['attempts']}, "
+                  f"retrying in {backoff:.0f}s): {str(e)}")
+            with self._cond:
+                self.failures += 1
+                self._delivering -= 1
+                self._persist(alert)
+                self._schedule(alert, time.time() + backoff)
+            return
+
+        self._discard(alert)
+        with self._cond:
+            self.sent += 1
+            self._delivering -= 1
+            self._cond.notify_all()
+
+    # Lifecycle
+
+    def pending(self):
+        with self._cond:
+            return len(self._ready)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._ready),
+                'sent': self.sent,
+                'coalesced': self.coalesced,
+                'failures': self.failures
+            }
+
+    def flush(self, timeout, retries=True):
+        """
+        Wait up to timeout seconds for every alert due within that time,
+        retries included, to be delivered. Follow-ups scheduled for later
+        are not waited for. With retries=False, wait only for the first
+        attempt at alerts already due; failed ones stay in the outbox for
+        the worker to retry. Returns False if any alert is still
+        undelivered, including one whose next retry falls after the timeout.
+        """
+        give_up_at = time.time() + timeout
+        due_by = give_up_at if retries else time.time()
+
+        def waiting():
+            return self._delivering or any(
+                ready_at <= due_by and (retries or not self._alerts[alert_id]['attempts'])
+                for ready_at, _, alert_id in self._ready)
+
+        with self._cond:
+            while waiting():
+                remaining = give_up_at - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not any(alert['attempts'] for alert in self._alerts.values())
+
+    def close(self):
+        """Stop the worker; undelivered alerts stay in the outbox"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=5.0)
+        self.outbox.close()
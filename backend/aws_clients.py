@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Shared AWS client registry for the Mental Health Agent
+
+boto3 clients are expensive to build (credential resolution, endpoint
+resolution, service model loading) but are thread-safe once created, so we
+build each one at most once per container and reuse it across warm
+invocations.
+
+Every client is built from one tuned botocore Config: a connection pool
+sized for the agent's thread pools, adaptive retries, TCP keepalive and
+read timeouts that fit what each service is used for. prewarm() opens
+connections ahead of the first request so it does not pay for DNS and TLS.
+
+boto3 itself is imported on first use: it is most of the handler's import
+time, and CORS preflights and the local fakes never need it. preload()
+imports it up front for containers that would rather pay during init.
+"""
+
+import os
+import threading
+import time
+
+from deadline import DeadlineExceeded
+
+DEFAULT_REGION = 'us-east-1'
+
+# Read timeouts per service. Each client only serves one kind of call here:
+# bedrock-runtime generates replies, bedrock-agentcore does small memory
+# reads/writes, ses sends alert emails.
+SERVICE_READ_TIMEOUTS = {
+    'bedrock-runtime': 30,
+    'bedrock-agentcore': 5,
+    'ses': 10
+}
+DEFAULT_READ_TIMEOUT = 30
+
+# Deadline-derived read timeouts are rounded down to one of these so a
+# handful of clients cover every request instead of one per distinct budget
+READ_TIMEOUT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+
+# Shortest read timeout worth an attempt per service. A deadline-bound
+# client gets as many attempts as fit in the budget with a bucketed read
+# timeout of this length or more, counting the retry backoff, so even all
+# of them timing out stays inside it. A generation can take most of this
+# before its first byte, hence the long floor for bedrock-runtime.
+MIN_ATTEMPT_SECONDS = {
+    'bedrock-runtime': 12,
+    'bedrock-agentcore': 0.5,
+    'ses': 2
+}
+DEFAULT_MIN_ATTEMPT_SECONDS = 2
+
+# Errors returned before the service does any work. A single-attempt call
+# (one whose budget is not split) may still retry these: they come back
+# quickly and leave the budget almost untouched.
+FAST_RETRY_CODES = ('ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException')
+
+_clients = {}
+_installed = set()
+_clients_lock = threading.Lock()
+
+
+def _use_local_aws():
+    return os.environ.get('USE_LOCAL_AWS', 'false').lower() == 'true'
+
+
+def _max_attempts():
+    return int(os.environ.get('AWS_MAX_ATTEMPTS', '3'))
+
+
+def _timeout_bucket(read_timeout):
+    """Largest bucket that still fits inside read_timeout"""
+    fitting = [bucket for bucket in READ_TIMEOUT_BUCKETS if bucket <= read_timeout]
+    if not fitting:
+        raise DeadlineExceeded(f"{read_timeout:.3f}s is too little for an AWS call")
+    return fitting[-1]
+
+
+def attempt_plan(service_name, budget, retries=True):
+    """
+    (attempts, per-attempt read timeout) for a call that must finish within
+    budget seconds. botocore's backoff before retry n is at most 2**(n-1)
+    seconds, so that is set aside first. With retries=False the call gets
+    one attempt with the whole budget; see fast_retry_delay().
+    """
+    floor = MIN_ATTEMPT_SECONDS.get(service_name, DEFAULT_MIN_ATTEMPT_SECONDS)
+    cap = SERVICE_READ_TIMEOUTS.get(service_name, DEFAULT_READ_TIMEOUT)
+    most = max(_max_attempts(), 1) if retries else 1
+    for attempts in range(most, 1, -1):
+        per_attempt = (budget - (2 ** (attempts - 1) - 1)) / attempts
+        if per_attempt < floor:
+            continue
+        # The floor applies to the timeout actually used, after rounding down
+        read_timeout = _timeout_bucket(min(per_attempt, cap))
+        if read_timeout >= floor:
+            return attempts, read_timeout
+    return 1, _timeout_bucket(min(budget, cap))
+
+
+def fast_retry_delay(service_name, error, attempt, budget):
+    """
+    Seconds to wait before retrying a single-attempt call that failed with
+    error on try number attempt, or None if it should not be retried: only
+    FAST_RETRY_CODES are, and only while a full-length attempt still fits
+    in the budget seconds left.
+    """
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    if code not in FAST_RETRY_CODES or attempt >= _max_attempts():
+        return None
+    delay = min(0.2 * (2 ** (attempt - 1)), 1.0)
+    floor = MIN_ATTEMPT_SECONDS.get(service_name, DEFAULT_MIN_ATTEMPT_SECONDS)
+    cap = SERVICE_READ_TIMEOUTS.get(service_name, DEFAULT_READ_TIMEOUT)
+    if budget - delay < floor or _timeout_bucket(min(budget - delay, cap)) < floor:
+        return None
+    return delay
+
+
+def client_config(service_name, read_timeout=None, attempts=None):
+    """
+    botocore Config for a service. A deadline-bound client passes the
+    read_timeout and attempts from attempt_plan() so retries fit its budget.
+    """
+    from botocore.config import Config
+
+    connect_timeout = float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '2'))
+    config = Config(
+        max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '32')),
+        connect_timeout=connect_timeout,
+        read_timeout=SERVICE_READ_TIMEOUTS.get(service_name, DEFAULT_READ_TIMEOUT),
+        retries={'mode': 'adaptive', 'total_max_attempts': _max_attempts()},
+        tcp_keepalive=True
+    )
+    if read_timeout is not None:
+        config = config.merge(Config(
+            connect_timeout=min(read_timeout, connect_timeout),
+            read_timeout=read_timeout,
+            retries={'mode': 'adaptive', 'total_max_attempts': attempts or 1}
+        ))
+    return config
+
+
+def _build_client(service_name, region_name, read_timeout, attempts):
+    if _use_local_aws():
+        # Offline benchmarking / load testing against in-process fakes
+        from local_aws import build_local_client, latency_from_env
+        return build_local_client(service_name, latency_from_env())
+    import boto3
+    return boto3.client(service_name, region_name=region_name,
+                        config=client_config(service_name, read_timeout, attempts))
+
+
+def preload():
+    """Import boto3 and botocore now instead of on the first client build"""
+    start = time.perf_counter()
+    import boto3
+    import botocore.config
+    print(f"📦 Loaded boto3 in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def get_client(service_name, region_name=DEFAULT_REGION, read_timeout=None, retries=True):
+    """
+    Return the shared client for a service, creating it on first use.
+    With read_timeout (seconds left in a request's budget) the client's
+    attempts, retries included, fit inside it; raises DeadlineExceeded if
+    not even one short attempt does. retries=False gives the one attempt
+    the whole budget.
+    """
+    key = (service_name, region_name)
+    attempts = None
+    if read_timeout is not None and key not in _installed and not _use_local_aws():
+        attempts, read_timeout = attempt_plan(service_name, read_timeout, retries)
+        key = (service_name, region_name, read_timeout, attempts)
+    else:
+        # Stand-ins keep their state in the instance, so they are never split
+        read_timeout = None
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        # Another thread may have built it while we were waiting
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(service_name, region_name, read_timeout, attempts)
+            _clients[key] = client
+            timeout_note = f", read timeout {read_timeout}s x {attempts} attempts" if read_timeout else ""
+            print(f"🔌 Created {service_name} client ({region_name}{timeout_note})")
+        return client
+
+
+def set_client(service_name, client, region_name=DEFAULT_REGION):
+    """Install a client explicitly (e.g. a stand-in for local testing)"""
+    with _clients_lock:
+        _clients[(service_name, region_name)] = client
+        _installed.add((service_name, region_name))
+
+
+def reset_clients():
+    """Drop all cached clients so the next lookup builds fresh ones"""
+    with _clients_lock:
+        _clients.clear()
+        _installed.clear()
+
+
+def prewarm(calls, connections=1, timeout=3.0):
+    """
+    Open pooled connections ahead of real traffic.
+
+    calls maps a label to a cheap callable against one client; each is run
+    `connections` times in parallel so that many keep-alive connections are
+    left in the pool. Errors are expected and ignored - an error response
+    still means DNS, TCP and TLS are done. Waits at most `timeout` seconds.
+    """
+    start = time.perf_counter()
+    results = {}
+
+    def run(label, call):
+        try:
+            call()
+            results[label] = 'ok'
+        except Exception as e:
+            results[label] = type(e).__name__
+
+    threads = [threading.Thread(target=run, args=(label, call), name=f'prewarm-{label}', daemon=True)
+               for label, call in calls.items() for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(max(timeout - (time.perf_counter() - start), 0))
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"🔥 Pre-warmed connections in {elapsed_ms:.0f}ms: {results}")
+    return results
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Cold-start accounting for the Lambda handler
+
+The handler module imports this first, so the clock starts before any other
+module is loaded. We record how long the imports took and, on a container's
+first invocation, how long after import began that response went out
+(time to first response). Later invocations count as warm.
+
+For a per-module breakdown, set PYTHONPROFILEIMPORTTIME=1 on the function:
+the interpreter then writes one line per imported module to stderr, which
+lands in CloudWatch Logs. tests/profile_cold_start.py does the same locally.
+"""
+
+import os
+import threading
+import time
+
+from latency_metrics import emit_emf
+
+
+class ColdStartTracker:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.import_ms = None
+        self.first_response_ms = None
+        self.first_method = None
+        self.invocations = 0
+        self._lock = threading.Lock()
+
+    def mark_imported(self):
+        """Call once the handler module has finished loading"""
+        self.import_ms = round((time.perf_counter() - self.started_at) * 1000, 2)
+
+    def begin(self):
+        """Count an invocation; True for the container's first one"""
+        with self._lock:
+            self.invocations += 1
+            return self.invocations == 1
+
+    def finish(self, cold, method):
+        """Record time to first response after a cold invocation"""
+        if not cold:
+            return
+        self.first_response_ms = round((time.perf_counter() - self.started_at) * 1000, 2)
+        self.first_method = method
+        print(f"🧊 Cold start: imports {self.import_ms}ms, first response ({method}) "
+              f"{self.first_response_ms}ms after import began")
+        if os.environ.get('EMIT_EMF_METRICS', 'true').lower() != 'false':
+            emit_emf({'import': self.import_ms or 0.0, 'first_response': self.first_response_ms},
+                     os.environ.get('METRICS_NAMESPACE', 'MentalHealthAgent'),
+                     {'Service': 'cold-start', 'Method': method or 'unknown'})
+
+    def snapshot(self):
+        return {
+            'import_ms': self.import_ms,
+            'first_response_ms': self.first_response_ms,
+            'first_method': self.first_method,
+            'invocations': self.invocations
+        }
+
+
+# One per process: the container-wide cold-start record
+COLD_START = ColdStartTracker()
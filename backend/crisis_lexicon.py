@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Precompiled crisis keyword matcher
+
+Every tier of the crisis lexicon is folded into one keyword trie, and the
+trie is compiled into a single regular expression so the scan runs in the
+C regex engine: one left-to-right pass over the message whose cost barely
+moves as the lexicon grows. Matches start on a word boundary and end on
+one after an optional inflection ("overdosed", "hopelessness", "burdens"),
+so "burden" still does not fire inside "burdensome". Irregular forms
+("panicking") are listed in the lexicon itself. Matches carry their
+character offsets in the original message.
+"""
+
+import re
+from collections import namedtuple
+
+LexiconMatch = namedtuple('LexiconMatch', ['keyword', 'tier', 'start', 'end'])
+
+# Typographic apostrophes from mobile keyboards should match "can't"
+_APOSTROPHES = str.maketrans({'’': "'", '‘': "'"})
+
+# Regular inflections a keyword may carry and still count as that keyword
+INFLECTIONS = ('s', 'es', 'd', 'ed', 'ing', 'ly', 'ness')
+_INFLECTION_PATTERN = '(?:' + '|'.join(sorted(INFLECTIONS, key=len, reverse=True)) + ')?'
+
+
+def _trie_pattern(node):
+    """Render a trie node as a regex that shares every common prefix"""
+    branches = [re.escape(ch) + _trie_pattern(child)
+                for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    # A keyword ends here, so the longer continuations are optional (and,
+    # being greedy, preferred)
+    return '(?:' + body + ')?' if '' in node else body
+
+
+class CrisisLexicon:
+    # Compiled lexicons by their tiers; instances never change once built
+    _shared = {}
+
+    @classmethod
+    def shared(cls, tiers):
+        """
+        One compiled lexicon per distinct tier list, per process. A pre-fork
+        parent that builds it once hands the compiled pattern to every worker.
+        """
+        key = tuple((name, tuple(keywords)) for name, keywords in tiers)
+        lexicon = cls._shared.get(key)
+        if lexicon is None:
+            lexicon = cls._shared[key] = cls(tiers)
+        return lexicon
+
+    def __init__(self, tiers):
+        """
+        tiers: ordered list of (tier_name, keywords). A keyword listed in
+        more than one tier belongs to the first one.
+        """
+        self.tier_names = [name for name, _ in tiers]
+        self.keyword_tiers = {}
+
+        trie = {}
+        for tier_name, keywords in tiers:
+            for keyword in keywords:
+                normalized = keyword.lower().translate(_APOSTROPHES)
+                if not normalized or normalized in self.keyword_tiers:
+                    continue
+                self.keyword_tiers[normalized] = tier_name
+                node = trie
+                for ch in normalized:
+                    node = node.setdefault(ch, {})
+                node[''] = True
+
+        # The lookahead lets matches at different start positions overlap;
+        # at any one start the longest keyword wins
+        self.pattern = None
+        if trie:
+            self.pattern = re.compile(r'(?<!\w)(?=(' + _trie_pattern(trie) + ')(' + _INFLECTION_PATTERN + r')(?!\w))')
+
+    @property
+    def keywords(self):
+        return list(self.keyword_tiers)
+
+    def _normalize(self, text):
+        """Lowercase for matching while keeping offsets aligned with the input"""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters expand when lowercased (e.g. 'İ'); fold them
+            # one by one so every position still maps to the original
+            lowered = ''.join(ch.lower()[0] for ch in text)
+        return lowered.translate(_APOSTROPHES)
+
+    def scan(self, text):
+        """Return every keyword match, inflections included, in one pass over the text"""
+        if self.pattern is None:
+            return []
+
+        keyword_tiers = self.keyword_tiers
+        return [
+            LexiconMatch(match.group(1), keyword_tiers[match.group(1)], match.start(1), match.end(2))
+            for match in self.pattern.finditer(self._normalize(text))
+        ]
+
+    def matches_by_tier(self, text):
+        """Scan once and group matches by tier, in tier order"""
+        grouped = {name: [] for name in self.tier_names}
+        for match in self.scan(text):
+            grouped[match.tier].append(match)
+        return grouped
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Request-scoped deadlines for the chat pipeline
+
+A Deadline is created once per request from the Lambda context and handed
+to every stage. Optional stages (context, insights) only get the time
+left after generation's reserve, so a slow memory read can never eat the
+budget the model call needs, and nothing outlives API Gateway's limit.
+"""
+
+import time
+
+# API Gateway REST integrations give up after 29 seconds regardless of the
+# Lambda timeout
+API_GATEWAY_TIMEOUT_SECONDS = 29.0
+
+# Left unspent for serializing and returning the response
+RESPONSE_MARGIN_SECONDS = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage has no budget left to start"""
+
+
+class Deadline:
+    __slots__ = ('expires_at',)
+
+    def __init__(self, budget_seconds):
+        self.expires_at = time.monotonic() + budget_seconds
+
+    @classmethod
+    def from_lambda_context(cls, context, default_seconds=API_GATEWAY_TIMEOUT_SECONDS,
+                            margin_seconds=RESPONSE_MARGIN_SECONDS):
+        """The earlier of the Lambda's remaining time and default_seconds, less a margin"""
+        budget = default_seconds
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            budget = min(budget, context.get_remaining_time_in_millis() / 1000.0)
+        return cls(max(budget - margin_seconds, 0.0))
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def budget_for(self, cap_seconds, reserve_seconds=0.0):
+        """Time a stage may spend: at most cap_seconds, leaving reserve_seconds untouched"""
+        return max(min(cap_seconds, self.remaining() - reserve_seconds), 0.0)
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.3f}s)"
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Write-behind buffer for AgentCore Memory conversation events
+
+A finished turn (USER + ASSISTANT message) is spooled to local disk and
+queued; a background worker writes it to AgentCore Memory as a single
+multi-message create_event after the reply has gone out. The spool keeps
+a turn through a crash or restart of the process before the worker gets
+to it: records whose buffer is gone are replayed, once, by the next buffer
+started on that spool root. It does not help once the environment itself
+is recycled (Lambda wipes /tmp), so a Lambda invocation gives each queued
+turn one attempt before it returns (flush(retries=False)).
+
+Turns of one session are written in the order they were recorded: while a
+session's oldest unwritten turn waits to be retried, its later turns wait
+behind it. A turn that exhausts its attempts is parked, with the session's
+later turns, and retried by this same buffer after park_seconds, so it is
+not stranded in the spool until the process exits.
+"""
+
+import atexit
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from spool import Spool
+
+# Queued by flush() so the worker writes what it has without waiting to batch
+_FLUSH = object()
+
+
+class EventWriteBuffer:
+    def __init__(self, write_func, spool_dir, max_queue=1000, flush_size=25,
+                 flush_interval=0.2, max_attempts=5, park_seconds=60.0):
+        """
+        write_func(actor_id, session_id, messages) -> bool performs the
+        actual create_event call; a False return (or exception) is retried.
+        """
+        self.write_func = write_func
+        self.spool_dir = spool_dir
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.park_seconds = park_seconds
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._idle = threading.Condition()
+        # Turns not yet written, parked ones excepted
+        self._in_flight = 0
+        # Ids of turns queued but not yet attempted (or held behind one that was)
+        self._unattempted = set()
+        self._closed = False
+        # Sessions whose oldest turn is waiting to be retried:
+        # (actor_id, session_id) -> [retry_at, deque of that session's turns]
+        # Only the worker touches this and _parked.
+        self._held = {}
+        # Ids of held turns that ran out of attempts and wait for park_seconds
+        self._parked = set()
+
+        self.spool = Spool(spool_dir)
+
+        self._worker = threading.Thread(target=self._run, name='event-write-behind', daemon=True)
+        self._worker.start()
+        self._replay_spool()
+        atexit.register(self.close)
+
+    def _replay_spool(self):
+        """Requeue turns whose buffer (a crashed or closed one) never wrote them"""
+        entries = self.spool.claim_orphans('spooled event')
+        if entries:
+            print(f"📼 Replaying {len(entries)} spooled memory events")
+        for entry in sorted(entries, key=lambda e: e['recorded_at']):
+            entry['attempts'] = 0
+            self._enqueue(entry)
+
+    # Producer side
+
+    def record_turn(self, actor_id, session_id, messages):
+        """Spool and queue a turn's messages; returns without any network I/O"""
+        entry = {
+            'id': uuid.uuid4().hex,
+            'actor_id': actor_id,
+            'session_id': session_id,
+            'messages': [list(message) for message in messages],
+            'recorded_at': time.time(),
+            'attempts': 0
+        }
+        self.spool.write(entry['id'], entry)
+        self._enqueue(entry)
+
+    def _enqueue(self, entry):
+        with self._idle:
+            self._in_flight += 1
+            self._unattempted.add(entry['id'])
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Backpressure instead of loss: the caller waits for room, and
+            # the session's turns stay in order
+            print("⚠️ Event buffer full - waiting for the writer")
+            self._queue.put(entry)
+
+    # Worker side
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self._idle_wait())]
+            except queue.Empty:
+                batch = []
+
+            # Collect whatever else is waiting, up to the flush size, unless
+            # a flush asked for it to be written now
+            deadline = time.monotonic() + self.flush_interval
+            while batch and batch[-1] is not _FLUSH and len(batch) < self.flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._retry_due()
+            for entry in batch:
+                if entry is _FLUSH:
+                    continue
+                held = self._held.get((entry['actor_id'], entry['session_id']))
+                if held:
+                    held[1].append(entry)
+                    if held[1][0]['id'] in self._parked:
+                        self._park([entry])
+                    self._attempted([entry])
+                else:
+                    self._write_in_order([entry])
+
+            if self._closed and self._queue.empty():
+                return
+
+    def _idle_wait(self):
+        """How long the worker may sleep before a held session is due"""
+        if not self._held:
+            return self.flush_interval
+        next_retry = min(retry_at for retry_at, _ in self._held.values())
+        return min(max(next_retry - time.monotonic(), 0.0), self.flush_interval)
+
+    def _retry_due(self):
+        now = time.monotonic()
+        for key, (retry_at, entries) in list(self._held.items()):
+            if retry_at <= now:
+                del self._held[key]
+                self._write_in_order(list(entries))
+
+    def _write_in_order(self, entries):
+        """Write one session's turns oldest first; on a failure, hold the rest behind it"""
+        try:
+            for index, entry in enumerate(entries):
+                if self._write(entry):
+                    continue
+
+                waiting = entries[index:]
+                entry['attempts'] += 1
+                if self._closed:
+                    # Shutting down: the next buffer on this spool replays them in order
+                    self._park(waiting)
+                    return
+                if entry['attempts'] >= self.max_attempts:
+                    print(f"⚠️ Parking event {entry['id']} and {len(waiting) - 1} later turns of the "
+                          f"session for {self.park_seconds:.0f}s")
+                    self._park(waiting)
+                    entry['attempts'] = 0
+                    retry_at = time.monotonic() + self.park_seconds
+                else:
+                    retry_at = time.monotonic() + min(0.1 * (2 ** entry['attempts']), 5.0)
+
+                self.spool.write(entry['id'], entry)
+                self._held[(entry['actor_id'], entry['session_id'])] = [retry_at, deque(waiting)]
+                return
+        finally:
+            self._attempted(entries)
+
+    def _park(self, entries):
+        """Stop counting turns as in flight; they stay on disk and in _held"""
+        for entry in entries:
+            if entry['id'] not in self._parked:
+                self._parked.add(entry['id'])
+                self._done()
+
+    def _attempted(self, entries):
+        with self._idle:
+            self._unattempted.difference_update(entry['id'] for entry in entries)
+            if not self._unattempted:
+                self._idle.notify_all()
+
+    def _write(self, entry):
+        messages = [tuple(message) for message in entry['messages']]
+        try:
+            stored = self.write_func(entry['actor_id'], entry['session_id'], messages)
+        except Exception as e:
+            print(f"⚠️ Write-behind event failed: {str(e)}")
+            stored = False
+
+        if stored:
+            self.spool.remove(entry['id'])
+            if entry['id'] in self._parked:
+                self._parked.discard(entry['id'])
+            else:
+                self._done()
+        return stored
+
+    def _done(self):
+        with self._idle:
+            self._in_flight -= 1
+            if self._in_flight <= 0:
+                self._idle.notify_all()
+
+    # Lifecycle
+
+    def pending(self):
+        with self._idle:
+            return self._in_flight
+
+    def flush(self, timeout=5.0, retries=True):
+        """
+        Block until every queued turn has been written or parked. With
+        retries=False, return once each has had one attempt instead of
+        waiting out the backoff; True only if nothing is left unwritten.
+        """
+        deadline = time.monotonic() + timeout
+
+        def waiting():
+            return self._in_flight > 0 if retries else bool(self._unattempted)
+
+        with self._idle:
+            if not waiting():
+                return self._in_flight <= 0
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            pass
+        with self._idle:
+            while waiting():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+            return self._in_flight <= 0
+
+    def close(self, timeout=5.0):
+        """Flush at shutdown; anything unwritten stays in the spool"""
+        if self._closed:
+            return
+        flushed = self.flush(timeout)
+        self._closed = True
+        if not flushed:
+            print(f"⚠️ Shutting down with {self.pending()} unwritten events in spool")
+        self.spool.close()
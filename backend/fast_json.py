@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+JSON serialization for the request path
+
+Every turn parses the API Gateway body and each streamed model chunk, and
+serializes the Bedrock request, the SSE frames and the response payload.
+orjson does this several times faster than the stdlib and is used when it
+is installed; otherwise we fall back to the stdlib with compact
+separators.
+
+Bedrock request bodies are assembled from pre-serialized pieces: the
+constant envelope and the system blocks, which are identical on every
+turn, are serialized once and reused.
+"""
+
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+ANTHROPIC_VERSION = 'bedrock-2023-05-31'
+
+# loads() takes str or bytes; dumps() returns str, dumps_bytes() bytes
+if orjson:
+    loads = orjson.loads
+    dumps_bytes = orjson.dumps
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    loads = json.loads
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+    def dumps_bytes(obj):
+        return dumps(obj).encode('utf-8')
+
+
+# Pre-serialized fragments
+
+_ANTHROPIC_HEAD = b'{"anthropic_version":' + dumps_bytes(ANTHROPIC_VERSION) + b',"max_tokens":'
+
+# System blocks are a handful of long, constant strings (persona, insights
+# header plus lines, session summary), so their encodings are memoized
+_MAX_CACHED_BLOCKS = 512
+_block_cache = {}
+_block_cache_lock = threading.Lock()
+
+
+def _text_block_bytes(block):
+    if set(block) - {'type', 'text', 'cache_control'} or block.get('type') != 'text':
+        return dumps_bytes(block)
+
+    key = (block['text'], 'cache_control' in block)
+    encoded = _block_cache.get(key)
+    if encoded is None:
+        encoded = dumps_bytes(block)
+        with _block_cache_lock:
+            if len(_block_cache) >= _MAX_CACHED_BLOCKS:
+                _block_cache.clear()
+            _block_cache[key] = encoded
+    return encoded
+
+
+def anthropic_request_body(max_tokens, system, messages):
+    """
+    Bytes of an Anthropic Messages request for Bedrock. system may be a
+    string or a list of text blocks; the blocks' encodings are reused
+    across calls.
+    """
+    if isinstance(system, str):
+        system_bytes = dumps_bytes(system)
+    else:
+        system_bytes = b'[' + b','.join(_text_block_bytes(block) for block in system) + b']'
+    return b''.join((
+        _ANTHROPIC_HEAD, str(int(max_tokens)).encode('ascii'),
+        b',"system":', system_bytes,
+        b',"messages":', dumps_bytes(messages),
+        b'}'
+    ))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency instrumentation for the chat pipeline
+
+Every turn produces a dict of monotonic stage timings (milliseconds). They
+are folded into fixed-bucket histograms that can be merged across threads,
+processes or containers, emitted as CloudWatch Embedded Metric Format log
+lines, and rendered as a Server-Timing response header.
+"""
+
+import bisect
+import json
+import threading
+import time
+
+# Bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (
+    1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750,
+    1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 30000, 60000
+)
+
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def merge(self, other):
+        """Add another histogram's samples into this one"""
+        for i, bucket_count in enumerate(other.counts):
+            self.counts[i] += bucket_count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+
+    def percentile(self, p):
+        """Estimate the p-th percentile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS_MS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+                fraction = (rank - seen) / bucket_count
+                return round(min(lower + (upper - lower) * fraction, self.max_ms), 2)
+            seen += bucket_count
+        return round(self.max_ms, 2)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 2),
+            'buckets': list(self.counts)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = list(data['buckets'])
+        histogram.count = data['count']
+        histogram.total_ms = data['mean_ms'] * data['count']
+        histogram.max_ms = data['max_ms']
+        return histogram
+
+
+class StageLatencyRecorder:
+    """Thread-safe set of per-stage histograms for one process"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings):
+        with self._lock:
+            for stage, value_ms in timings.items():
+                histogram = self._histograms.get(stage)
+                if histogram is None:
+                    histogram = self._histograms[stage] = LatencyHistogram()
+                histogram.record(value_ms)
+
+    def merge(self, other):
+        with self._lock:
+            for stage, histogram in other.snapshot_histograms().items():
+                self._histograms.setdefault(stage, LatencyHistogram()).merge(histogram)
+        return self
+
+    def snapshot_histograms(self):
+        with self._lock:
+            return {stage: LatencyHistogram().merge(h) for stage, h in self._histograms.items()}
+
+    def snapshot(self):
+        return {stage: h.to_dict() for stage, h in self.snapshot_histograms().items()}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Process-wide recorder the agent and handler report into
+STAGE_LATENCY = StageLatencyRecorder()
+
+
+def emf_record(timings, namespace, dimensions, units=None):
+    """
+    Build a CloudWatch Embedded Metric Format record for one request.
+    Values are milliseconds unless units names another unit (e.g. 'Count').
+    """
+    units = units or {}
+    return {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': stage, 'Unit': units.get(stage, 'Milliseconds')} for stage in timings]
+            }]
+        },
+        **dimensions,
+        **timings
+    }
+
+
+def emit_emf(timings, namespace='MentalHealthAgent', dimensions=None, units=None):
+    """Print the EMF line; CloudWatch Logs turns it into metrics"""
+    print(json.dumps(emf_record(timings, namespace, dimensions or {'Service': 'chat'}, units)))
+
+
+def server_timing_header(timings):
+    """Render timings as a Server-Timing header value"""
+    return ', '.join(f"{stage};dur={value_ms:.1f}" for stage, value_ms in timings.items())
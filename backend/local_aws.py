@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for Bedrock Runtime, AgentCore Memory and SES
+
+In-process fakes that implement the client methods the agent calls, so the
+whole pipeline can be benchmarked and load tested without an AWS account.
+Each fake takes a latency model per operation plus throttling/error
+injection, and responses can be recorded from real clients and replayed.
+
+    from local_aws import install_local_services
+    services = install_local_services(latency={'invoke_model': LatencyModel.lognormal(800, 0.4)})
+
+Setting USE_LOCAL_AWS=true makes aws_clients hand these out instead of
+boto3 clients.
+"""
+
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+
+try:
+    from botocore.exceptions import ClientError
+except ImportError:
+    class ClientError(Exception):
+        """Mirror of botocore's ClientError for environments without botocore"""
+
+        def __init__(self, error_response, operation_name):
+            self.response = error_response
+            self.operation_name = operation_name
+            error = error_response.get('Error', {})
+            super().__init__(f"An error occurred ({error.get('Code')}) when calling the "
+                             f"{operation_name} operation: {error.get('Message')}")
+
+
+class LatencyModel:
+    """A latency distribution in milliseconds; sample() returns seconds"""
+
+    def __init__(self, sampler, description):
+        self._sampler = sampler
+        self.description = description
+
+    def sample(self):
+        return max(self._sampler(), 0.0) / 1000.0
+
+    def __repr__(self):
+        return f"LatencyModel({self.description})"
+
+    @classmethod
+    def constant(cls, ms):
+        return cls(lambda: ms, f"constant {ms}ms")
+
+    @classmethod
+    def uniform(cls, low_ms, high_ms, rng=None):
+        rng = rng or random.Random()
+        return cls(lambda: rng.uniform(low_ms, high_ms), f"uniform {low_ms}-{high_ms}ms")
+
+    @classmethod
+    def lognormal(cls, median_ms, sigma=0.5, rng=None):
+        """Right-skewed like real service latency; sigma widens the tail"""
+        rng = rng or random.Random()
+        mu = math.log(median_ms)
+        return cls(lambda: rng.lognormvariate(mu, sigma), f"lognormal median {median_ms}ms sigma {sigma}")
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build from a dict such as {'type': 'lognormal', 'median_ms': 40, 'sigma': 0.6}"""
+        kind = spec.get('type', 'constant')
+        if kind == 'constant':
+            return cls.constant(spec.get('ms', 0))
+        if kind == 'uniform':
+            return cls.uniform(spec['low_ms'], spec['high_ms'])
+        if kind == 'lognormal':
+            return cls.lognormal(spec['median_ms'], spec.get('sigma', 0.5))
+        raise ValueError(f"Unknown latency model type: {kind}")
+
+
+NO_LATENCY = LatencyModel.constant(0)
+
+# Rough production shapes, used when nothing else is configured
+DEFAULT_LATENCY = {
+    'invoke_model': LatencyModel.lognormal(1800, 0.35),
+    'invoke_model_with_response_stream': LatencyModel.lognormal(450, 0.35),
+    'create_event': LatencyModel.lognormal(60, 0.5),
+    'list_events': LatencyModel.lognormal(70, 0.5),
+    'retrieve_memories': LatencyModel.lognormal(180, 0.6),
+    'send_email': LatencyModel.lognormal(90, 0.4),
+}
+
+
+class FaultInjector:
+    """Raise throttling or service errors on a configurable share of calls"""
+
+    def __init__(self, throttle_rate=0.0, error_rate=0.0, operations=None, seed=None):
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.operations = set(operations) if operations else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def check(self, operation):
+        if self.operations is not None and operation not in self.operations:
+            return
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'},
+                               'ResponseMetadata': {'HTTPStatusCode': 429}}, operation)
+        if roll < self.throttle_rate + self.error_rate:
+            raise ClientError({'Error': {'Code': 'ServiceUnavailableException', 'Message': 'Injected failure'},
+                               'ResponseMetadata': {'HTTPStatusCode': 503}}, operation)
+
+
+class _LocalService:
+    """Shared latency, fault and call-count plumbing"""
+
+    def __init__(self, latency=None, faults=None):
+        self.latency = dict(DEFAULT_LATENCY)
+        if latency:
+            self.latency.update(latency)
+        self.faults = faults or FaultInjector()
+        self.calls = {}
+        self._calls_lock = threading.Lock()
+
+    def _enter(self, operation):
+        with self._calls_lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        time.sleep(self.latency.get(operation, NO_LATENCY).sample())
+        self.faults.check(operation)
+
+
+class LocalBedrockRuntime(_LocalService):
+    """invoke_model / invoke_model_with_response_stream for Anthropic models"""
+
+    REPLIES = [
+        "Thank you for sharing that with me. It sounds like you're carrying a lot right now, "
+        "and it makes sense to feel that way. What has been weighing on you the most today?",
+        "I'm really glad you reached out. Your feelings are valid. One thing that can help in "
+        "moments like this is slow breathing: in for four counts, hold for four, out for six. "
+        "Would you like to try that together?",
+        "That sounds really hard, and you don't have to go through it alone. If you ever feel "
+        "unsafe, please call or text 988 to reach someone right away. What kind of support "
+        "would feel most helpful right now?",
+    ]
+
+    def __init__(self, latency=None, faults=None, token_latency=None, reply_func=None):
+        super().__init__(latency, faults)
+        self.token_latency = token_latency or LatencyModel.lognormal(18, 0.3)
+        self.reply_func = reply_func
+        self._replies = itertools.cycle(self.REPLIES)
+        self._lock = threading.Lock()
+
+    def _reply(self, request):
+        if self.reply_func:
+            return self.reply_func(request)
+        with self._lock:
+            return next(self._replies)
+
+    def _usage(self, request, reply):
+        prompt_chars = len(json.dumps(request.get('system', ''))) + len(json.dumps(request.get('messages', [])))
+        return {'input_tokens': prompt_chars // 4, 'output_tokens': max(len(reply) // 4, 1),
+                'cache_read_input_tokens': 0, 'cache_creation_input_tokens': 0}
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self._enter('invoke_model')
+        request = json.loads(body)
+        reply = self._reply(request)
+        result = {
+            'id': f"msg_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': modelId,
+            'content': [{'type': 'text', 'text': reply}],
+            'stop_reason': 'end_turn',
+            'usage': self._usage(request, reply)
+        }
+        return {'body': io.BytesIO(json.dumps(result).encode('utf-8')), 'contentType': 'application/json'}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        # Latency here is time to first token; tokens then trickle in
+        self._enter('invoke_model_with_response_stream')
+        request = json.loads(body)
+        reply = self._reply(request)
+        usage = self._usage(request, reply)
+        token_latency = self.token_latency
+
+        def events():
+            def chunk(payload):
+                return {'chunk': {'bytes': json.dumps(payload).encode('utf-8')}}
+
+            yield chunk({'type': 'message_start', 'message': {
+                'role': 'assistant', 'model': modelId,
+                'usage': {k: v for k, v in usage.items() if k != 'output_tokens'}}})
+            words = reply.split(' ')
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(token_latency.sample())
+                text = word if i == 0 else ' ' + word
+                yield chunk({'type': 'content_block_delta', 'index': 0,
+                             'delta': {'type': 'text_delta', 'text': text}})
+            yield chunk({'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                         'usage': {'output_tokens': usage['output_tokens']}})
+            yield chunk({'type': 'message_stop'})
+
+        return {'body': events(), 'contentType': 'application/json'}
+
+
+class LocalAgentCoreMemory(_LocalService):
+    """create_event / list_events / retrieve_memories backed by dicts"""
+
+    def __init__(self, latency=None, faults=None, memories=None):
+        """memories: {namespace: [memory dicts]} returned by retrieve_memories"""
+        super().__init__(latency, faults)
+        self.memories = memories or {}
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def create_event(self, memoryId, actorId, sessionId, messages, **kwargs):
+        self._enter('create_event')
+        event = {
+            'eventId': uuid.uuid4().hex,
+            'timestamp': datetime.now().isoformat(),
+            'messages': [list(message) for message in messages]
+        }
+        with self._lock:
+            self._events.setdefault((memoryId, actorId, sessionId), []).append(event)
+        return {'event': event}
+
+    def list_events(self, memoryId, actorId, sessionId, maxResults=20, nextToken=None, **kwargs):
+        """Newest event first, paginated with an opaque nextToken"""
+        self._enter('list_events')
+        with self._lock:
+            events = list(reversed(self._events.get((memoryId, actorId, sessionId), [])))
+        start = int(nextToken) if nextToken else 0
+        page = events[start:start + maxResults]
+        response = {'events': page}
+        if start + maxResults < len(events):
+            response['nextToken'] = str(start + maxResults)
+        return response
+
+    def retrieve_memories(self, memoryId, namespace, query, **kwargs):
+        self._enter('retrieve_memories')
+        return {'memories': list(self.memories.get(namespace, []))}
+
+
+class LocalSES(_LocalService):
+    """send_email that records messages instead of delivering them"""
+
+    def __init__(self, latency=None, faults=None):
+        super().__init__(latency, faults)
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_email(self, Source, Destination, Message, **kwargs):
+        self._enter('send_email')
+        message_id = uuid.uuid4().hex
+        with self._lock:
+            self.sent.append({'MessageId': message_id, 'Source': Source,
+                              'Destination': Destination, 'Message': Message})
+        return {'MessageId': message_id}
+
+
+# Record / replay
+
+def _request_key(operation, params):
+    canonical = json.dumps(params, sort_keys=True, default=str)
+    return f"{operation}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]}"
+
+
+class RecordingClient:
+    """
+    Wrap a real client and capture every response to a JSON file, keyed by
+    operation and request parameters. Streaming bodies are materialized so
+    they can be replayed.
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._recordings = json.load(f)
+        except FileNotFoundError:
+            self._recordings = {}
+
+    def __getattr__(self, operation):
+        method = getattr(self._client, operation)
+
+        def call(**params):
+            response = method(**params)
+            saved = {k: v for k, v in response.items() if k != 'body'}
+            if operation == 'invoke_model':
+                raw = response['body'].read()
+                saved['body'] = raw.decode('utf-8')
+                response['body'] = io.BytesIO(raw)
+            elif operation == 'invoke_model_with_response_stream':
+                events = [{'chunk': {'bytes': e['chunk']['bytes'].decode('utf-8')}}
+                          for e in response['body'] if 'chunk' in e]
+                saved['body_events'] = events
+                response['body'] = iter([{'chunk': {'bytes': e['chunk']['bytes'].encode('utf-8')}}
+                                         for e in events])
+            with self._lock:
+                self._recordings.setdefault(_request_key(operation, params), []).append(
+                    json.loads(json.dumps(saved, default=str)))
+                with open(self._path, 'w') as f:
+                    json.dump(self._recordings, f)
+            return response
+
+        return call
+
+
+class ReplayClient(_LocalService):
+    """
+    Serve responses captured by RecordingClient. An exact request match is
+    preferred; otherwise recordings of the same operation are cycled so
+    captured traffic can drive load tests with new inputs.
+    """
+
+    def __init__(self, path, latency=None, faults=None):
+        super().__init__(latency, faults)
+        with open(path) as f:
+            self._recordings = json.load(f)
+        self._by_operation = {}
+        for key, responses in self._recordings.items():
+            self._by_operation.setdefault(key.split(':', 1)[0], []).extend(responses)
+        self._cursors = {op: itertools.cycle(responses) for op, responses in self._by_operation.items()}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, operation):
+        if operation.startswith('_') or operation not in self._by_operation:
+            raise AttributeError(operation)
+
+        def call(**params):
+            self._enter(operation)
+            with self._lock:
+                exact = self._recordings.get(_request_key(operation, params))
+                saved = exact[0] if exact else next(self._cursors[operation])
+            response = {k: v for k, v in saved.items() if k not in ('body', 'body_events')}
+            if 'body' in saved:
+                response['body'] = io.BytesIO(saved['body'].encode('utf-8'))
+            if 'body_events' in saved:
+                response['body'] = iter([{'chunk': {'bytes': e['chunk']['bytes'].encode('utf-8')}}
+                                         for e in saved['body_events']])
+            return response
+
+        return call
+
+
+def latency_from_env():
+    """
+    Per-operation latency overrides from LOCAL_AWS_LATENCY, a JSON object
+    such as {"invoke_model": {"type": "constant", "ms": 50}}
+    """
+    spec = os.environ.get('LOCAL_AWS_LATENCY')
+    if not spec:
+        return None
+    return {operation: LatencyModel.from_spec(model) for operation, model in json.loads(spec).items()}
+
+
+def build_local_client(service_name, latency=None, faults=None):
+    """Create the stand-in for one boto3 service name"""
+    if service_name == 'bedrock-runtime':
+        return LocalBedrockRuntime(latency, faults)
+    if service_name == 'bedrock-agentcore':
+        return LocalAgentCoreMemory(latency, faults)
+    if service_name == 'ses':
+        return LocalSES(latency, faults)
+    raise ValueError(f"No local stand-in for {service_name}")
+
+
+def install_local_services(latency=None, faults=None, region_name='us-east-1'):
+    """Register stand-ins for all three services in the shared client registry"""
+    from aws_clients import set_client
+
+    services = {}
+    for service_name in ('bedrock-runtime', 'bedrock-agentcore', 'ses'):
+        services[service_name] = build_local_client(service_name, latency, faults)
+        set_client(service_name, services[service_name], region_name)
+    print(f"🧪 Local AWS stand-ins installed for {', '.join(services)}")
+    return services
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+In-process caches in front of AgentCore Memory reads
+
+Short-term context for a session is mostly written by this same process,
+so we keep a small ring buffer of recent messages per (actor, session),
+append to it as turns are stored, and only go back to list_events on a
+miss or once the entry's TTL has passed.
+
+Long-term insights only change when AgentCore's background strategies
+consolidate, so they are cached per actor and refreshed in the background
+rather than retrieved on every message.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Rough per-message bookkeeping overhead (slotted record, deque slot, strings)
+_MESSAGE_OVERHEAD_BYTES = 150
+
+
+def _message_bytes(message):
+    return len(message.message.encode('utf-8')) + _MESSAGE_OVERHEAD_BYTES
+
+
+class _ContextEntry:
+    __slots__ = ('messages', 'size', 'loaded_at')
+
+    def __init__(self, capacity, loaded_at):
+        self.messages = deque(maxlen=capacity)
+        self.size = 0
+        self.loaded_at = loaded_at
+
+
+class ConversationContextCache:
+    def __init__(self, capacity=20, ttl_seconds=300, max_bytes=32 * 1024 * 1024):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, actor_id, session_id):
+        """Return the cached ContextMessages (oldest first), or None on a miss"""
+        key = (actor_id, session_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                # Other containers may have written to this session since
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry.messages)
+
+    def fill(self, actor_id, session_id, messages):
+        """Replace an entry with an authoritative list_events result"""
+        key = (actor_id, session_id)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry = _ContextEntry(self.capacity, time.monotonic())
+            self._entries[key] = entry
+            self._extend(entry, messages)
+            self._evict()
+
+    def append(self, actor_id, session_id, messages):
+        """
+        Add just-stored messages to a cached session. Sessions that are not
+        cached are left alone; the next read loads them in full. A leading
+        message that is already the newest cached one (because the read
+        raced the write) is not added twice.
+        """
+        key = (actor_id, session_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+
+            messages = list(messages)
+            if messages and entry.messages:
+                newest = entry.messages[-1]
+                first = messages[0]
+                if newest.role == first.role and newest.message == first.message:
+                    messages = messages[1:]
+
+            self._extend(entry, messages)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, actor_id, session_id):
+        with self._lock:
+            if (actor_id, session_id) in self._entries:
+                self._remove((actor_id, session_id))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'expirations': self.expirations,
+                'evictions': self.evictions
+            }
+
+    # Callers hold self._lock for everything below
+
+    def _extend(self, entry, messages):
+        for message in messages:
+            if len(entry.messages) == entry.messages.maxlen:
+                dropped = entry.messages[0]
+                entry.size -= _message_bytes(dropped)
+                self._bytes -= _message_bytes(dropped)
+            entry.messages.append(message)
+            size = _message_bytes(message)
+            entry.size += size
+            self._bytes += size
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        """Drop least recently used sessions until we are under the byte cap"""
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+
+class _InsightsEntry:
+    __slots__ = ('insights', 'loaded_at')
+
+    def __init__(self, insights, loaded_at):
+        self.insights = insights
+        self.loaded_at = loaded_at
+
+
+class InsightsCache:
+    """
+    Per-actor cache of long-term memory insights with stale-while-revalidate.
+
+    Within ttl_seconds an entry is served as-is. For a further
+    stale_seconds it is still served, but a single background refresh is
+    started so the next turn sees fresh data. Past that it is a miss and
+    the caller loads synchronously.
+    """
+
+    def __init__(self, loader, executor, ttl_seconds=600, stale_seconds=3600, max_entries=10000):
+        """loader(actor_id) returns the insights list and raises on failure"""
+        self.loader = loader
+        self.executor = executor
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def get(self, actor_id, **loader_kwargs):
+        """loader_kwargs are passed to a synchronous load, not to background refreshes"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(actor_id)
+            age = now - entry.loaded_at if entry else None
+
+            if entry and age <= self.ttl_seconds:
+                self._entries.move_to_end(actor_id)
+                self.hits += 1
+                return entry.insights
+
+            if entry and age <= self.ttl_seconds + self.stale_seconds:
+                self._entries.move_to_end(actor_id)
+                self.stale_hits += 1
+                if actor_id not in self._refreshing:
+                    self._refreshing.add(actor_id)
+                    self.executor.submit(self._refresh, actor_id)
+                return entry.insights
+
+            self.misses += 1
+
+        insights = self.loader(actor_id, **loader_kwargs)
+        self._store(actor_id, insights)
+        return insights
+
+    def _refresh(self, actor_id):
+        try:
+            insights = self.loader(actor_id)
+            self._store(actor_id, insights)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            print(f"⚠️ Background insights refresh failed: {str(e)}")
+            with self._lock:
+                self.refresh_failures += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(actor_id)
+
+    def _store(self, actor_id, insights):
+        with self._lock:
+            self._entries[actor_id] = _InsightsEntry(insights, time.monotonic())
+            self._entries.move_to_end(actor_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, actor_id):
+        with self._lock:
+            self._entries.pop(actor_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures
+            }
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Lazy reads of AgentCore Memory session events
+
+A long session can hold far more events than one list_events page, and
+the prompt only ever uses the most recent few messages. These generators
+walk the pages newest first and yield one compact record per message, so
+callers can stop as soon as they have enough and no further pages are
+fetched.
+"""
+
+class ContextMessage:
+    """One conversation message; slotted to keep cached sessions small"""
+    __slots__ = ('message', 'role', 'timestamp')
+
+    def __init__(self, message, role, timestamp=None):
+        self.message = message
+        self.role = role
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return f"ContextMessage({self.role}, {self.message[:40]!r})"
+
+
+def iter_events(list_events, memory_id, actor_id, session_id, page_size=10):
+    """
+    Yield a session's events newest first, one page at a time. list_events
+    is called with the usual keyword arguments plus nextToken for later
+    pages; a page is only requested once the previous one is used up.
+    """
+    next_token = None
+    while True:
+        params = {'memoryId': memory_id, 'actorId': actor_id, 'sessionId': session_id,
+                  'maxResults': page_size}
+        if next_token:
+            params['nextToken'] = next_token
+        response = list_events(**params)
+
+        events = response.get('events', [])
+        # Pages come back newest first; order within the page defensively
+        yield from sorted(events, key=lambda event: event.get('timestamp') or '', reverse=True)
+
+        next_token = response.get('nextToken')
+        if not next_token or not events:
+            return
+
+
+def iter_messages(events):
+    """Flatten events into ContextMessages, newest first"""
+    for event in events:
+        timestamp = event.get('timestamp')
+        for message in reversed(event.get('messages', [])):
+            yield ContextMessage(message[0], message[1], timestamp)
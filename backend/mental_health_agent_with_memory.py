@@ -3,16 +3,53 @@
 Mental Health Agent with AgentCore Memory Integration
 """
 
-import json
-import boto3
+# Imported before everything else so the cold-start clock covers all imports
+from cold_start import COLD_START
+
+import os
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import fast_json
+from alert_dispatcher import CrisisAlertDispatcher
+from aws_clients import fast_retry_delay, get_client, preload, prewarm, reset_clients
+from crisis_lexicon import CrisisLexicon
+from deadline import Deadline, DeadlineExceeded
+from event_buffer import EventWriteBuffer
+from latency_metrics import STAGE_LATENCY, emit_emf, server_timing_header
+from memory_cache import ConversationContextCache, InsightsCache
+from memory_events import ContextMessage, iter_events, iter_messages
+from model_router import ModelRouter
+from prompt_builder import PromptBuilder
+from resilience import CircuitBreaker, HedgedCall
+from session_lock import SessionLocks
+from session_summarizer import SUMMARY_ROLE, SessionSummarizer, decode_summary, summary_request
+
+FALLBACK_RESPONSE = "I'm here to listen and support you. While I'm having technical difficulties right now, please know that your feelings are valid and help is available. If you're in crisis, please contact a mental health professional or crisis hotline immediately."
+
+DEFAULT_EVENT_SPOOL_DIR = '/tmp/mental-health-event-spool'
+DEFAULT_ALERT_OUTBOX_DIR = '/tmp/mental-health-alert-outbox'
+
+CRISIS_KEYWORDS = (
+    'suicide', 'kill myself', 'end it all', 'want to die', 'better off dead',
+    'hurt myself', 'self harm', 'cut myself', 'overdose', 'jump off',
+    'no point living', 'life is meaningless', 'hopeless', 'trapped',
+    'can\'t go on', 'give up', 'worthless', 'burden',
+    # Inflections the lexicon's regular suffixes do not cover
+    'overdosing'
+)
+MODERATE_KEYWORDS = ('depressed', 'anxious', 'panic', 'panicking', 'panicked', 'panicky',
+                     'overwhelmed', 'scared', 'alone')
+
+CRISIS_TIERS = (('HIGH', CRISIS_KEYWORDS), ('MODERATE', MODERATE_KEYWORDS))
+
+
 class MentalHealthAgentWithMemory:
     def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        self.agentcore = boto3.client('bedrock-agentcore', region_name='us-east-1')
-        self.ses = boto3.client('ses', region_name='us-east-1')
+        self.region = 'us-east-1'
         
         # AgentCore Memory configuration
         self.memory_id = 'MentalHealthChatbotMemory-GqmjCf2KIw'
@@ -23,105 +60,392 @@ class MentalHealthAgentWithMemory:
         
         # Model configuration
         self.model_id = "anthropic.claude-3-5-sonnet-20241022-v2:0"
+        self.fast_model_id = os.environ.get('FAST_MODEL_ID', 'anthropic.claude-3-5-haiku-20241022-v1:0')
         self.admin_email = "admin.alerts.mh@example.com"
         
+        # Crisis alerts are delivered by a background worker from a local
+        # outbox; exact repeats within the window are merged into one follow-up
+        self.alert_dispatcher = CrisisAlertDispatcher(
+            self._deliver_crisis_alert,
+            os.environ.get('ALERT_OUTBOX_DIR', DEFAULT_ALERT_OUTBOX_DIR),
+            dedup_window_seconds=float(os.environ.get('ALERT_DEDUP_WINDOW_SECONDS', '900'))
+        )
+        # Longest a Lambda reply waits for one attempt at its crisis alerts
+        self.alert_flush_seconds = float(os.environ.get('ALERT_FLUSH_SECONDS', '1'))
+        
+        # Low-risk short messages may go to the fast model; elevated risk never does
+        self.model_router = ModelRouter(
+            self.model_id,
+            self.fast_model_id,
+            enabled=os.environ.get('MODEL_ROUTING', 'true').lower() != 'false',
+            full_max_tokens=int(os.environ.get('MAX_TOKENS', '500')),
+            fast_max_tokens=int(os.environ.get('FAST_MAX_TOKENS', '300')),
+            fast_message_tokens=int(os.environ.get('FAST_MESSAGE_TOKENS', '60'))
+        )
+        
+        # Context and insights are fitted into this many prompt tokens
+        self.prompt_builder = PromptBuilder(
+            token_budget=int(os.environ.get('PROMPT_TOKEN_BUDGET', '2000')),
+            caching=os.environ.get('PROMPT_CACHING', 'true').lower() != 'false'
+        )
+        
         # Crisis detection keywords
-        self.crisis_keywords = [
-            'suicide', 'kill myself', 'end it all', 'want to die', 'better off dead',
-            'hurt myself', 'self harm', 'cut myself', 'overdose', 'jump off',
-            'no point living', 'life is meaningless', 'hopeless', 'trapped',
-            'can\'t go on', 'give up', 'worthless', 'burden'
-        ]
+        self.crisis_keywords = list(CRISIS_KEYWORDS)
+        
+        # Moderate risk indicators
+        self.moderate_keywords = list(MODERATE_KEYWORDS)
+        
+        # Both tiers compiled once into a single automaton
+        self.crisis_lexicon = CrisisLexicon.shared(CRISIS_TIERS)
+        
+        # Pipeline configuration: run the independent memory/crisis stages
+        # in parallel instead of one network round trip after another
+        self.concurrent_stages = os.environ.get('CONCURRENT_STAGES', 'true').lower() != 'false'
+        self.stage_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('STAGE_WORKERS', '8')),
+                                                 thread_name_prefix='chat-stage')
+        
+        # Per-dependency circuit breakers: once AgentCore Memory or Bedrock is
+        # failing, turns skip it immediately instead of waiting out timeouts
+        breaker_settings = dict(
+            failure_rate=float(os.environ.get('BREAKER_FAILURE_RATE', '0.5')),
+            min_calls=int(os.environ.get('BREAKER_MIN_CALLS', '5')),
+            open_seconds=float(os.environ.get('BREAKER_OPEN_SECONDS', '15'))
+        )
+        self.memory_breaker = CircuitBreaker('agentcore-memory', **breaker_settings)
+        self.bedrock_breaker = CircuitBreaker('bedrock', **breaker_settings)
+        
+        # Memory reads are idempotent, so slow ones are hedged with a duplicate
+        # and all of them are bounded by a deadline
+        self.memory_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('MEMORY_READ_WORKERS', '16')),
+                                                  thread_name_prefix='memory-read')
+        self.memory_reads = HedgedCall(
+            self.memory_executor,
+            timeout_seconds=float(os.environ.get('MEMORY_READ_TIMEOUT_SECONDS', '1.5')),
+            percentile=float(os.environ.get('HEDGE_PERCENTILE', '95'))
+        )
+        
+        # Seconds of a request's deadline that context/insights may never
+        # touch, so generation always has time to finish
+        self.generation_reserve_seconds = float(os.environ.get('GENERATION_RESERVE_SECONDS', '10'))
+        
+        # Turns of one session run one at a time, in arrival order; a turn
+        # waits at most this long for the previous one
+        self.session_locks = SessionLocks()
+        self.session_wait_seconds = float(os.environ.get('SESSION_WAIT_SECONDS', '30'))
+        
+        # Recent messages per (actor, session), kept current as we store turns
+        self.context_cache = ConversationContextCache(
+            capacity=int(os.environ.get('CONTEXT_CACHE_MESSAGES', '20')),
+            ttl_seconds=float(os.environ.get('CONTEXT_CACHE_TTL_SECONDS', '300')),
+            max_bytes=int(os.environ.get('CONTEXT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+        )
+        
+        # Long-term insights per actor, refreshed in the background once stale
+        self.insights_cache = InsightsCache(
+            self._retrieve_user_memory_insights,
+            self.stage_executor,
+            ttl_seconds=float(os.environ.get('INSIGHTS_CACHE_TTL_SECONDS', '600')),
+            stale_seconds=float(os.environ.get('INSIGHTS_CACHE_STALE_SECONDS', '3600'))
+        )
+        
+        # Stage timings go to the process histograms and, as EMF, to CloudWatch
+        self.metrics_namespace = os.environ.get('METRICS_NAMESPACE', 'MentalHealthAgent')
+        self.emit_metrics = os.environ.get('EMIT_EMF_METRICS', 'true').lower() != 'false'
+        
+        # Write-behind: each turn's USER + ASSISTANT messages are spooled to
+        # local disk and written as one event after the reply is returned
+        self.write_behind = os.environ.get('WRITE_BEHIND_EVENTS', 'true').lower() != 'false'
+        # Longest a Lambda reply waits for one attempt at its turn's write
+        self.event_flush_seconds = float(os.environ.get('EVENT_FLUSH_SECONDS', '1'))
+        self.event_buffer = None
+        if self.write_behind:
+            self.event_buffer = EventWriteBuffer(
+                self.store_conversation_turn,
+                os.environ.get('EVENT_SPOOL_DIR', DEFAULT_EVENT_SPOOL_DIR)
+            )
+        
+        # Long sessions: every few turns, older messages are folded into a
+        # running summary off the response path
+        self.summary_model_id = os.environ.get('SUMMARY_MODEL_ID', self.fast_model_id or self.model_id)
+        self.summary_max_tokens = int(os.environ.get('SUMMARY_MAX_TOKENS', '400'))
+        self.session_summarizer = None
+        if os.environ.get('SESSION_SUMMARIES', 'true').lower() != 'false':
+            self.session_summarizer = SessionSummarizer(
+                self._summarize_session,
+                self._persist_messages,
+                ThreadPoolExecutor(max_workers=2, thread_name_prefix='session-summary'),
+                every_turns=int(os.environ.get('SUMMARY_EVERY_TURNS', '4')),
+                tail_messages=int(os.environ.get('SUMMARY_TAIL_MESSAGES', '6'))
+            )
+        
+        # Open Bedrock/AgentCore connections now rather than on the first turn
+        if os.environ.get('PREWARM_CONNECTIONS', 'false').lower() == 'true':
+            self.prewarm_connections(int(os.environ.get('PREWARM_CONNECTIONS_PER_SERVICE', '2')))
         
         print("✅ Mental Health Agent with Memory initialized")
     
-    def store_conversation_event(self, actor_id, session_id, message, role):
-        """Store conversation event in AgentCore Memory"""
+    # AWS clients come from the shared registry so they are built once per
+    # container; SES in particular is only created when an alert fires.
+    @property
+    def bedrock(self):
+        return get_client('bedrock-runtime', self.region)
+    
+    @property
+    def agentcore(self):
+        return get_client('bedrock-agentcore', self.region)
+    
+    @property
+    def ses(self):
+        return get_client('ses', self.region)
+    
+    def prewarm_connections(self, connections=2):
+        """
+        Pay DNS, TCP and TLS for the services every turn uses before the
+        first request. The calls are cheap on purpose: an empty model body
+        is rejected before any tokens are processed, and the memory read
+        targets a session that does not exist.
+        """
+        return prewarm({
+            'bedrock-runtime': lambda: self.bedrock.invoke_model(modelId=self.model_id, body='{}'),
+            'bedrock-agentcore': lambda: self.agentcore.list_events(
+                memoryId=self.memory_id, actorId='prewarm', sessionId='prewarm', maxResults=1)
+        }, connections=connections)
+    
+    def _memory_read(self, operation, deadline=None, **kwargs):
+        """
+        Idempotent AgentCore Memory read behind the breaker, hedged and
+        bounded by the read timeout or, with a request deadline, by
+        whatever budget is left after generation's reserve.
+        """
+        if deadline is None:
+            client = self.agentcore
+            timeout = self.memory_reads.timeout_seconds
+        else:
+            timeout = deadline.budget_for(self.memory_reads.timeout_seconds, self.generation_reserve_seconds)
+            if timeout <= 0:
+                raise DeadlineExceeded(f"no budget left for {operation}")
+            client = get_client('bedrock-agentcore', self.region, read_timeout=timeout)
+        return self.memory_breaker.call(self.memory_reads.call, getattr(client, operation),
+                                        timeout_seconds=timeout, **kwargs)
+    
+    def _bedrock_client(self, deadline, retries=True):
+        """Bedrock client whose read timeout fits the request's remaining time"""
+        if deadline is None:
+            return self.bedrock
+        return get_client('bedrock-runtime', self.region, read_timeout=deadline.remaining(), retries=retries)
+    
+    def _invoke_within(self, deadline, **kwargs):
+        """
+        invoke_model as one attempt with the whole remaining budget: a
+        generation that times out has used it up, so only quick rejections
+        (throttling) are retried, and only while a full attempt still fits.
+        """
+        if deadline is None:
+            return self.bedrock.invoke_model(**kwargs)
+        attempt = 1
+        while True:
+            try:
+                return self._bedrock_client(deadline, retries=False).invoke_model(**kwargs)
+            except Exception as e:
+                delay = fast_retry_delay('bedrock-runtime', e, attempt, deadline.remaining())
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+    
+    def dependency_health(self):
+        """Breaker state per dependency, reported with every response"""
+        return {
+            'memory': self.memory_breaker.state,
+            'bedrock': self.bedrock_breaker.state
+        }
+    
+    def store_conversation_turn(self, actor_id, session_id, messages):
+        """Store one or more (message, role) pairs as a single AgentCore Memory event"""
+        roles = '+'.join(role for _, role in messages)
         try:
-            # Store event in short-term memory
-            response = self.agentcore.create_event(
+            # Store event in short-term memory; an open breaker fails fast
+            response = self.memory_breaker.call(
+                self.agentcore.create_event,
                 memoryId=self.memory_id,
                 actorId=actor_id,
                 sessionId=session_id,
-                messages=[(message, role)]
+                messages=list(messages)
             )
-            print(f"📝 Stored {role} message in memory")
+            print(f"📝 Stored {roles} message in memory")
             return True
             
         except Exception as e:
             print(f"⚠️ Could not store event in memory: {str(e)}")
             return False
     
-    def get_conversation_context(self, actor_id, session_id, max_results=10):
-        """Retrieve conversation context from AgentCore Memory"""
+    def _persist_messages(self, actor_id, session_id, messages):
+        """Store (message, role) pairs through the write-behind buffer when it is on"""
+        if self.event_buffer:
+            self.event_buffer.record_turn(actor_id, session_id, messages)
+        else:
+            self.store_conversation_turn(actor_id, session_id, messages)
+    
+    def store_conversation_event(self, actor_id, session_id, message, role):
+        """Store conversation event in AgentCore Memory"""
+        return self.store_conversation_turn(actor_id, session_id, [(message, role)])
+    
+    def get_conversation_context(self, actor_id, session_id, max_results=10, deadline=None):
+        """
+        Retrieve recent conversation context from AgentCore Memory as
+        ContextMessages, oldest first. Events are paged max_results at a
+        time, newest first, until the context cache's capacity is filled.
+        """
+        cached = self.context_cache.get(actor_id, session_id)
+        if cached is not None:
+            stats = self.context_cache.stats()
+            print(f"📚 Context cache hit: {len(cached)} messages "
+                  f"(hits={stats['hits']}, misses={stats['misses']})")
+            return cached
+        
+        def list_events(**params):
+            return self._memory_read('list_events', deadline, **params)
+        
+        # Newest first; no page is fetched beyond what the cache can hold, or
+        # beyond what the newest session summary leaves uncovered
+        newest = iter_messages(iter_events(list_events, self.memory_id, actor_id, session_id, max_results))
+        needed = self.context_cache.capacity
+        context = []
+        summary = None
         try:
-            # Get recent conversation events
-            response = self.agentcore.list_events(
-                memoryId=self.memory_id,
-                actorId=actor_id,
-                sessionId=session_id,
-                maxResults=max_results
-            )
-            
-            context = []
-            for event in response.get('events', []):
-                for message in event.get('messages', []):
-                    context.append({
-                        'message': message[0],
-                        'role': message[1],
-                        'timestamp': event.get('timestamp')
-                    })
-            
-            print(f"📚 Retrieved {len(context)} context messages")
-            return context
-            
+            for message in newest:
+                if message.role == SUMMARY_ROLE:
+                    decoded = decode_summary(message.message) if summary is None else None
+                    if decoded:
+                        summary, tail = decoded
+                        needed = min(needed, len(context) + tail)
+                else:
+                    context.append(message)
+                if len(context) >= needed:
+                    break
         except Exception as e:
             print(f"⚠️ Could not retrieve context: {str(e)}")
-            return []
+            # Use whatever pages did arrive, but don't cache a partial read
+            context.reverse()
+            return context
+        
+        context.reverse()
+        self.context_cache.fill(actor_id, session_id, context)
+        if self.session_summarizer:
+            self.session_summarizer.seed(actor_id, session_id, summary, context)
+        print(f"📚 Retrieved {len(context)} context messages")
+        return context
+    
+    def _retrieve_user_memory_insights(self, actor_id, deadline=None):
+        """Query long-term memory for the actor; raises on failure"""
+        # Try to retrieve user preferences and patterns
+        response = self._memory_read(
+            'retrieve_memories',
+            deadline,
+            memoryId=self.memory_id,
+            namespace=f"/users/{actor_id}",
+            query="user preferences communication style coping strategies"
+        )
+        
+        insights = response.get('memories', [])
+        print(f"🧠 Retrieved {len(insights)} memory insights")
+        return insights
     
-    def get_user_memory_insights(self, actor_id):
+    def get_user_memory_insights(self, actor_id, deadline=None):
         """Get user insights from long-term memory (if available)"""
         try:
-            # Try to retrieve user preferences and patterns
-            response = self.agentcore.retrieve_memories(
-                memoryId=self.memory_id,
-                namespace=f"/users/{actor_id}",
-                query="user preferences communication style coping strategies"
-            )
-            
-            insights = response.get('memories', [])
-            print(f"🧠 Retrieved {len(insights)} memory insights")
-            return insights
+            return self.insights_cache.get(actor_id, deadline=deadline)
             
         except Exception as e:
             print(f"⚠️ Could not retrieve memory insights: {str(e)}")
             return []
     
+    def _summarize_session(self, previous_summary, messages):
+        """Fold messages into a session's running summary; raises on failure"""
+        response = self.bedrock_breaker.call(
+            self.bedrock.invoke_model,
+            modelId=self.summary_model_id,
+            body=summary_request(previous_summary, messages, self.summary_max_tokens)
+        )
+        return fast_json.loads(response['body'].read())['content'][0]['text'].strip()
+    
+    def _prompt_context(self, actor_id, session_id, context):
+        """
+        (context, summary) for the prompt: once a session has a summary,
+        only the messages it does not cover yet are sent alongside it.
+        """
+        if not self.session_summarizer:
+            return context, None
+        summary, unsummarized = self.session_summarizer.view(actor_id, session_id)
+        if summary is None:
+            return context, None
+        return (context[-unsummarized:] if unsummarized else []), summary
+    
+    def end_session(self, actor_id, session_id):
+        """
+        Called when a conversation ends. AgentCore consolidates long-term
+        memory from finished sessions, so the actor's cached insights are
+        dropped and the next session retrieves them fresh.
+        """
+        self.insights_cache.invalidate(actor_id)
+        self.context_cache.invalidate(actor_id, session_id)
+        self.model_router.end_session(actor_id, session_id)
+        if self.session_summarizer:
+            self.session_summarizer.end_session(actor_id, session_id)
+        if self.event_buffer:
+            self.event_buffer.flush()
+        print(f"🔚 Session {session_id} ended for {actor_id}")
+    
+    def settle(self, timeout):
+        """
+        Give crisis alerts due now one attempt of at most
+        alert_flush_seconds, then queued memory writes one attempt of at
+        most event_flush_seconds, all within timeout seconds. Lambda freezes
+        the container once the handler returns, so anything still queued
+        would only go out on a later invocation, or never. Alerts and
+        writes that fail stay in the outbox or spool and are retried in
+        the background.
+        """
+        give_up_at = time.monotonic() + timeout
+        if not self.alert_dispatcher.flush(min(self.alert_flush_seconds, timeout), retries=False):
+            print(f"⚠️ Returning with {self.alert_dispatcher.pending()} crisis alerts still undelivered")
+        if self.event_buffer:
+            budget = min(self.event_flush_seconds, max(give_up_at - time.monotonic(), 0.0))
+            if not self.event_buffer.flush(budget, retries=False):
+                print(f"⚠️ Returning with {self.event_buffer.pending()} memory events still unwritten")
+    
+    def close(self):
+        """Flush buffered memory writes and stop the alert worker before the process exits"""
+        if self.event_buffer:
+            self.event_buffer.close()
+        self.alert_dispatcher.close()
+    
     def detect_crisis(self, message):
         """Enhanced crisis detection with memory context"""
-        message_lower = message.lower()
+        matches = self.crisis_lexicon.matches_by_tier(message)
+        
+        def indicators(tier_matches):
+            # Unique keywords in the order they appear in the message
+            return list(dict.fromkeys(match.keyword for match in tier_matches))
         
-        detected_keywords = []
-        for keyword in self.crisis_keywords:
-            if keyword in message_lower:
-                detected_keywords.append(keyword)
+        def offsets(tier_matches):
+            return [{'keyword': m.keyword, 'start': m.start, 'end': m.end} for m in tier_matches]
         
-        if detected_keywords:
+        if matches['HIGH']:
             return {
                 'risk_level': 'HIGH',
-                'indicators': detected_keywords,
+                'indicators': indicators(matches['HIGH']),
+                'matches': offsets(matches['HIGH']),
                 'alert_needed': True,
                 'timestamp': datetime.now().isoformat()
             }
         
         # Check for moderate risk indicators
-        moderate_keywords = ['depressed', 'anxious', 'panic', 'overwhelmed', 'scared', 'alone']
-        moderate_detected = [kw for kw in moderate_keywords if kw in message_lower]
-        
-        if moderate_detected:
+        if matches['MODERATE']:
             return {
                 'risk_level': 'MODERATE',
-                'indicators': moderate_detected,
+                'indicators': indicators(matches['MODERATE']),
+                'matches': offsets(matches['MODERATE']),
                 'alert_needed': False,
                 'timestamp': datetime.now().isoformat()
             }
@@ -129,87 +453,117 @@ class MentalHealthAgentWithMemory:
         return {
             'risk_level': 'LOW',
             'indicators': [],
+            'matches': [],
             'alert_needed': False,
             'timestamp': datetime.now().isoformat()
         }
     
-    def generate_memory_enhanced_response(self, user_message, context, insights):
-        """Generate response using conversation context and user insights"""
-        
-        # Build enhanced prompt with memory context
-        context_text = ""
-        if context:
-            context_text = "\\n\\nRecent conversation context:\\n"
-            for msg in context[-5:]:  # Last 5 messages
-                role = "User" if msg['role'] == 'USER' else "Assistant"
-                context_text += f"{role}: {msg['message']}\\n"
-        
-        insights_text = ""
-        if insights:
-            insights_text = "\\n\\nUser insights from previous conversations:\\n"
-            for insight in insights[:3]:  # Top 3 insights
-                insights_text += f"- {insight.get('content', '')}\\n"
-        
-        prompt = f"""
-You are a compassionate mental health support agent. Provide empathetic, supportive responses.
-
-{context_text}
-
-{insights_text}
-
-Current user message: {user_message}
-
-Please respond with empathy and support. Guidelines:
-- Be warm and non-judgmental
-- Reference previous conversation context when relevant
-- Adapt to user's communication style from insights
-- Ask thoughtful follow-up questions
-- Validate their feelings
-- Encourage professional help when appropriate
-- Provide hope and support
-- Keep responses concise but meaningful
-
-Response:"""
-
+    def _model_request_body(self, prompt, max_tokens=500):
+        """Serialize the Bedrock request for a built prompt"""
+        return fast_json.anthropic_request_body(max_tokens, prompt.system, prompt.messages)
+    
+    def _record_usage(self, usage, reported):
+        """Copy token counts (including prompt-cache reads/writes) from a Bedrock usage block"""
+        for key in ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens'):
+            if reported.get(key) is not None:
+                usage[key] = reported[key]
+    
+    def _invoke_model(self, prompt, usage, deadline=None, route=None):
+        """Call Bedrock and return the full response text; fills usage"""
+        route = route or self.model_router.full_route()
         try:
-            response = self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 500,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ]
-                })
+            response = self.bedrock_breaker.call(
+                self._invoke_within,
+                deadline,
+                modelId=route.model_id,
+                body=self._model_request_body(prompt, route.max_tokens)
             )
             
-            result = json.loads(response['body'].read())
+            result = fast_json.loads(response['body'].read())
+            self._record_usage(usage, result.get('usage', {}))
             return result['content'][0]['text'].strip()
             
         except Exception as e:
             print(f"❌ Error generating response: {str(e)}")
-            return "I'm here to listen and support you. While I'm having technical difficulties right now, please know that your feelings are valid and help is available. If you're in crisis, please contact a mental health professional or crisis hotline immediately."
+            return FALLBACK_RESPONSE
     
-    def send_crisis_alert(self, actor_id, user_message, risk_assessment):
-        """Send crisis alert with memory context"""
+    def _stream_model(self, prompt, usage, deadline=None, route=None):
+        """Call Bedrock with response streaming and yield text chunks; fills usage"""
+        route = route or self.model_router.full_route()
+        emitted = False
+        response = None
+        
         try:
-            subject = f"MENTAL HEALTH CRISIS ALERT - {risk_assessment['risk_level']} RISK"
+            response = self.bedrock_breaker.call(
+                self._bedrock_client(deadline).invoke_model_with_response_stream,
+                modelId=route.model_id,
+                body=self._model_request_body(prompt, route.max_tokens)
+            )
             
-            body = f"""
+            for event in response['body']:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                payload = fast_json.loads(chunk['bytes'])
+                event_type = payload.get('type')
+                if event_type == 'content_block_delta':
+                    text = payload['delta'].get('text', '')
+                    if text:
+                        emitted = True
+                        yield text
+                elif event_type == 'message_start':
+                    self._record_usage(usage, payload.get('message', {}).get('usage', {}))
+                elif event_type == 'message_delta':
+                    self._record_usage(usage, payload.get('usage', {}))
+                        
+        except Exception as e:
+            print(f"❌ Error streaming response: {str(e)}")
+            if response is not None:
+                # A stream that dies after it opened still counts against Bedrock
+                self.bedrock_breaker.record_failure()
+            # Only fall back if the user has not already seen part of a reply
+            if not emitted:
+                yield FALLBACK_RESPONSE
+    
+    def generate_memory_enhanced_response(self, user_message, context, insights):
+        """Generate response using conversation context and user insights"""
+        prompt = self.prompt_builder.build(user_message, context, insights)
+        return self._invoke_model(prompt, {})
+    
+    def stream_memory_enhanced_response(self, user_message, context, insights):
+        """Yield response text chunks as Bedrock generates them"""
+        prompt = self.prompt_builder.build(user_message, context, insights)
+        yield from self._stream_model(prompt, {})
+    
+    def send_crisis_alert(self, actor_id, user_message, risk_assessment, session_id=None):
+        """Hand a crisis alert to the background dispatcher; never blocks on SES"""
+        print(f"🚨 CRISIS DETECTED: {risk_assessment}")
+        outcome = self.alert_dispatcher.dispatch(actor_id, session_id, user_message, risk_assessment)
+        print(f"🚨 Crisis alert {outcome} for {actor_id}")
+        return outcome
+    
+    def _deliver_crisis_alert(self, alert):
+        """Send crisis alert with memory context (runs on the dispatcher worker)"""
+        if alert['followup']:
+            subject = f"MENTAL HEALTH CRISIS ALERT - {alert['risk_level']} RISK (FOLLOW-UP, {len(alert['messages'])} more messages)"
+        else:
+            subject = f"MENTAL HEALTH CRISIS ALERT - {alert['risk_level']} RISK"
+        
+        user_messages = '\n'.join(f"[{entry['timestamp']}] \"{entry['message']}\"" for entry in alert['messages'])
+        
+        body = f"""
 URGENT: Mental Health Crisis Detected
 
-Timestamp: {risk_assessment['timestamp']}
-User ID: {actor_id}
-Risk Level: {risk_assessment['risk_level']}
+Timestamp: {alert['messages'][0]['timestamp']}
+User ID: {alert['actor_id']}
+Session ID: {alert['session_id']}
+Risk Level: {alert['risk_level']}
 
 CRISIS INDICATORS DETECTED:
-{', '.join(risk_assessment['indicators'])}
+{', '.join(alert['indicators'])}
 
 USER MESSAGE:
-"{user_message}"
+{user_messages}
 
 MEMORY CONTEXT:
 This alert includes context from the user's conversation history stored in AgentCore Memory.
@@ -224,61 +578,376 @@ IMMEDIATE ACTION REQUIRED:
 
 This is an automated alert from the Mental Health Support Agent with Memory.
 """
-            
-            # Note: This would fail without SES setup, but we'll catch the error
-            response = self.ses.send_email(
-                Source='noreply@example.com',
-                Destination={'ToAddresses': [self.admin_email]},
-                Message={
-                    'Subject': {'Data': subject},
-                    'Body': {'Text': {'Data': body}}
-                }
-            )
-            print(f"🚨 Crisis alert sent! MessageId: {response.get('MessageId', 'N/A')}")
-            
-        except Exception as e:
-            print(f"⚠️ Could not send email alert (SES not configured): {str(e)}")
-            print(f"🚨 CRISIS DETECTED: {risk_assessment}")
-    
-    def chat_with_memory(self, user_message, actor_id, session_id):
-        """Main chat function with memory integration"""
-        
-        print(f"📥 Processing message from {actor_id} in session {session_id}")
-        print(f"Message: {user_message}")
         
-        # Step 1: Store user message in memory
-        self.store_conversation_event(actor_id, session_id, user_message, "USER")
+        # Raises on failure (e.g. SES not configured) so the dispatcher retries
+        response = self.ses.send_email(
+            Source='noreply@example.com',
+            Destination={'ToAddresses': [self.admin_email]},
+            Message={
+                'Subject': {'Data': subject},
+                'Body': {'Text': {'Data': body}}
+            }
+        )
+        print(f"🚨 Crisis alert sent! MessageId: {response.get('MessageId', 'N/A')}")
+    
+    def _timed_stage(self, timings, stage, func, *args):
+        """Run one pipeline stage and record its duration in milliseconds"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+    
+    def _run_stages_sequential(self, user_message, actor_id, session_id, timings, deadline):
+        """Steps 1-5 one after another"""
+        # Step 1: Store user message in memory (deferred to step 7 with write-behind)
+        if not self.write_behind:
+            self._timed_stage(timings, 'store_user', self.store_conversation_event,
+                              actor_id, session_id, user_message, "USER")
         
         # Step 2: Get conversation context from memory
-        context = self.get_conversation_context(actor_id, session_id)
+        context = self._timed_stage(timings, 'context', self.get_conversation_context,
+                                    actor_id, session_id, 10, deadline)
         
         # Step 3: Get user insights from long-term memory
-        insights = self.get_user_memory_insights(actor_id)
+        insights = self._timed_stage(timings, 'insights', self.get_user_memory_insights,
+                                     actor_id, deadline)
         
         # Step 4: Detect crisis
-        risk_assessment = self.detect_crisis(user_message)
+        risk_assessment = self._timed_stage(timings, 'crisis', self.detect_crisis, user_message)
         
         # Step 5: Send alert if needed
         if risk_assessment['alert_needed']:
-            self.send_crisis_alert(actor_id, user_message, risk_assessment)
+            self._timed_stage(timings, 'alert', self.send_crisis_alert,
+                              actor_id, user_message, risk_assessment, session_id)
         
-        # Step 6: Generate memory-enhanced response
-        response = self.generate_memory_enhanced_response(user_message, context, insights)
+        return context, insights, risk_assessment
+    
+    def _run_stages_concurrent(self, user_message, actor_id, session_id, timings, deadline):
+        """Steps 1-5 fanned out on the stage executor and joined before generation"""
+        submit = self.stage_executor.submit
         
-        # Step 7: Store agent response in memory
-        self.store_conversation_event(actor_id, session_id, response, "ASSISTANT")
+        # Steps 1-3 are independent network calls. Context may be read before
+        # the user message lands, which is fine: the prompt carries the
+        # current message separately.
+        store_future = None
+        if not self.write_behind:
+            store_future = submit(self._timed_stage, timings, 'store_user', self.store_conversation_event,
+                                  actor_id, session_id, user_message, "USER")
+        context_future = submit(self._timed_stage, timings, 'context', self.get_conversation_context,
+                                actor_id, session_id, 10, deadline)
+        insights_future = submit(self._timed_stage, timings, 'insights', self.get_user_memory_insights,
+                                 actor_id, deadline)
         
-        print(f"📤 Response: {response[:100]}...")
+        # Step 4 is local CPU work, so run it here while the calls are in flight
+        risk_assessment = self._timed_stage(timings, 'crisis', self.detect_crisis, user_message)
         
+        # Step 5 only depends on the crisis result and just queues the alert
+        if risk_assessment['alert_needed']:
+            self._timed_stage(timings, 'alert', self.send_crisis_alert,
+                              actor_id, user_message, risk_assessment, session_id)
+        
+        context = context_future.result()
+        insights = insights_future.result()
+        if store_future:
+            store_future.result()
+        
+        return context, insights, risk_assessment
+    
+    def _prepare_turn(self, user_message, actor_id, session_id, timings, deadline):
+        """Steps 1-5: everything generation depends on"""
+        print(f"📥 Processing message from {actor_id} in session {session_id}")
+        print(f"Message: {user_message}")
+        
+        if self.concurrent_stages:
+            return self._run_stages_concurrent(user_message, actor_id, session_id, timings, deadline)
+        return self._run_stages_sequential(user_message, actor_id, session_id, timings, deadline)
+    
+    def _store_turn(self, user_message, response, actor_id, session_id, timings):
+        """Step 7: persist the turn"""
+        timestamp = datetime.now().isoformat()
+        turn = [ContextMessage(user_message, 'USER', timestamp),
+                ContextMessage(response, 'ASSISTANT', timestamp)]
+        self.context_cache.append(actor_id, session_id, turn)
+        
+        if self.write_behind:
+            # Both messages leave as one event once the reply is on its way
+            self._timed_stage(timings, 'store_turn', self.event_buffer.record_turn,
+                              actor_id, session_id, [(user_message, "USER"), (response, "ASSISTANT")])
+        else:
+            self._timed_stage(timings, 'store_assistant', self.store_conversation_event,
+                              actor_id, session_id, response, "ASSISTANT")
+        
+        if self.session_summarizer:
+            self.session_summarizer.record_turn(actor_id, session_id, turn)
+    
+    def _report_timings(self, timings, route):
+        """Record a finished turn's stage spans and the routed model's latency"""
+        STAGE_LATENCY.record(timings)
+        self.model_router.record_latency(route, timings['generation'])
+        if self.emit_metrics:
+            emit_emf(timings, self.metrics_namespace, {'Service': 'chat-pipeline'})
+            emit_emf({'generation': timings['generation']}, self.metrics_namespace,
+                     {'Service': 'model-router', 'ModelTier': route.tier})
+    
+    def _turn_result(self, response, risk_assessment, prompt, usage, route, actor_id, session_id, timings):
+        """Result dict shared by the blocking and streaming paths"""
         return {
             'response': response,
             'risk_assessment': risk_assessment,
-            'context_used': len(context),
-            'insights_used': len(insights),
+            'context_used': prompt.context_used,
+            'insights_used': prompt.insights_used,
+            'prompt_tokens': prompt.tokens,
+            'model_usage': usage,
+            'model_route': route._asdict(),
             'memory_id': self.memory_id,
             'session_id': session_id,
-            'actor_id': actor_id
+            'actor_id': actor_id,
+            'dependencies': self.dependency_health(),
+            'stage_timings': timings
         }
+    
+    def _session_turn(self, actor_id, session_id, deadline):
+        """Hold the session's turn lock, waiting no longer than the deadline allows"""
+        timeout = self.session_wait_seconds
+        if deadline is not None:
+            timeout = deadline.budget_for(timeout, self.generation_reserve_seconds)
+        return self.session_locks.hold((actor_id, session_id), timeout)
+    
+    def chat_with_memory(self, user_message, actor_id, session_id, deadline=None):
+        """
+        Main chat function with memory integration.
+        deadline bounds every stage; without one, stages use their own timeouts.
+        Turns of the same session are serialized in arrival order.
+        """
+        with self._session_turn(actor_id, session_id, deadline) as waited_ms:
+            return self._chat_turn(user_message, actor_id, session_id, deadline, waited_ms)
+    
+    def _chat_turn(self, user_message, actor_id, session_id, deadline, session_wait_ms):
+        timings = {'session_wait': session_wait_ms} if session_wait_ms else {}
+        pipeline_start = time.perf_counter()
+        
+        context, insights, risk_assessment = self._prepare_turn(
+            user_message, actor_id, session_id, timings, deadline)
+        
+        # Step 6: Generate memory-enhanced response
+        context, summary = self._prompt_context(actor_id, session_id, context)
+        prompt = self._timed_stage(timings, 'prompt', self.prompt_builder.build,
+                                   user_message, context, insights, summary)
+        route = self.model_router.route(user_message, risk_assessment, actor_id, session_id)
+        print(f"🧭 Routed to {route.tier} model ({route.reason}, max_tokens={route.max_tokens})")
+        usage = {}
+        response = self._timed_stage(timings, 'generation', self._invoke_model,
+                                     prompt, usage, deadline, route)
+        
+        # Step 7: Store the turn in memory
+        self._store_turn(user_message, response, actor_id, session_id, timings)
+        
+        timings['total'] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+        self._report_timings(timings, route)
+        
+        print(f"📤 Response: {response[:100]}...")
+        print(f"⏱️ Stage timings (ms): {timings}, prompt tokens: {prompt.tokens}, usage: {usage}")
+        
+        return self._turn_result(response, risk_assessment, prompt, usage, route,
+                                 actor_id, session_id, timings)
+    
+    def chat_with_memory_stream(self, user_message, actor_id, session_id, deadline=None):
+        """
+        Streaming variant of chat_with_memory.
+        Yields ('token', text) for each generated chunk and finally
+        ('done', result) once the ASSISTANT message has been stored.
+        """
+        with self._session_turn(actor_id, session_id, deadline) as waited_ms:
+            yield from self._chat_turn_stream(user_message, actor_id, session_id, deadline, waited_ms)
+    
+    def _chat_turn_stream(self, user_message, actor_id, session_id, deadline, session_wait_ms):
+        timings = {'session_wait': session_wait_ms} if session_wait_ms else {}
+        pipeline_start = time.perf_counter()
+        
+        context, insights, risk_assessment = self._prepare_turn(
+            user_message, actor_id, session_id, timings, deadline)
+        
+        # Step 6: Stream the memory-enhanced response
+        context, summary = self._prompt_context(actor_id, session_id, context)
+        prompt = self._timed_stage(timings, 'prompt', self.prompt_builder.build,
+                                   user_message, context, insights, summary)
+        route = self.model_router.route(user_message, risk_assessment, actor_id, session_id)
+        print(f"🧭 Routed to {route.tier} model ({route.reason}, max_tokens={route.max_tokens})")
+        usage = {}
+        generation_start = time.perf_counter()
+        chunks = []
+        for text in self._stream_model(prompt, usage, deadline, route):
+            if not chunks:
+                timings['first_token'] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+            chunks.append(text)
+            yield 'token', text
+        timings['generation'] = round((time.perf_counter() - generation_start) * 1000, 2)
+        response = ''.join(chunks).strip()
+        
+        # Step 7: Store the turn once the stream ends
+        self._store_turn(user_message, response, actor_id, session_id, timings)
+        
+        timings['total'] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+        self._report_timings(timings, route)
+        
+        print(f"📤 Streamed response: {response[:100]}...")
+        print(f"⏱️ Stage timings (ms): {timings}, prompt tokens: {prompt.tokens}, usage: {usage}")
+        
+        yield 'done', self._turn_result(response, risk_assessment, prompt, usage, route,
+                                        actor_id, session_id, timings)
+
+# Agent instance shared across warm invocations of the same container
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def get_agent():
+    """Return the container-wide agent, creating it on first use"""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = MentalHealthAgentWithMemory()
+    return _agent
+
+
+def preload_for_fork():
+    """
+    Start-up work a pre-fork parent does once for all of its workers: load
+    boto3 and the botocore service models (by building the clients and
+    dropping them again) and compile the crisis lexicon. No thread is
+    started and no connection opened, so forked children inherit the
+    results without sharing live state; each builds its own agent and
+    clients.
+    """
+    preload()
+    for service_name in ('bedrock-runtime', 'bedrock-agentcore', 'ses'):
+        get_client(service_name)
+    reset_clients()
+    CrisisLexicon.shared(CRISIS_TIERS)
+
+
+def reset_after_fork():
+    """
+    Drop any agent and clients a forked worker inherited. Their threads
+    did not survive the fork and their connections belong to the parent,
+    so the worker builds its own.
+    """
+    global _agent
+    _agent = None
+    reset_clients()
+
+
+# boto3 is imported on first use by default. With LAZY_IMPORTS=false it is
+# loaded during the Lambda init phase instead, which suits provisioned
+# concurrency, where init happens before any request is waiting.
+if os.environ.get('LAZY_IMPORTS', 'true').lower() == 'false':
+    preload()
+
+# With prewarming on, build the agent during the Lambda init phase so its
+# connections are open before the first invocation arrives. Only in Lambda:
+# the container server imports this module in its pre-fork supervisor, and
+# an agent built there would be inherited by every worker without its
+# threads.
+if (os.environ.get('PREWARM_CONNECTIONS', 'false').lower() == 'true'
+        and 'AWS_LAMBDA_FUNCTION_NAME' in os.environ):
+    get_agent()
+
+
+def build_response_payload(result):
+    """Client-facing JSON payload for a completed turn"""
+    return {
+        'response': result['response'],
+        'sessionId': result['session_id'],
+        'actorId': result['actor_id'],
+        'crisisDetected': result['risk_assessment']['alert_needed'],
+        'riskLevel': result['risk_assessment']['risk_level'],
+        'memoryContext': {
+            'contextMessages': result['context_used'],
+            'insights': result['insights_used'],
+            'promptTokens': result['prompt_tokens'],
+            'memoryId': result['memory_id']
+        },
+        'dependencies': result['dependencies'],
+        'modelUsage': {
+            'inputTokens': result['model_usage'].get('input_tokens'),
+            'outputTokens': result['model_usage'].get('output_tokens'),
+            'cacheReadInputTokens': result['model_usage'].get('cache_read_input_tokens', 0),
+            'cacheWriteInputTokens': result['model_usage'].get('cache_creation_input_tokens', 0)
+        },
+        'model': {
+            'id': result['model_route']['model_id'],
+            'tier': result['model_route']['tier'],
+            'reason': result['model_route']['reason']
+        },
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def format_sse(event_type, data):
+    """Encode one Server-Sent Event"""
+    return f"event: {event_type}\ndata: {fast_json.dumps(data)}\n\n"
+
+
+def iter_sse_events(agent, user_input, actor_id, session_id, on_complete=None, deadline=None):
+    """
+    Yield a chat turn as SSE frames: 'token' events while the model
+    generates, then a single 'done' event carrying the usual payload.
+    Hosts that support response streaming can write these as they arrive.
+    on_complete(result) is called with the turn result before 'done'.
+    """
+    for event_type, data in agent.chat_with_memory_stream(user_input, actor_id, session_id, deadline):
+        if event_type == 'token':
+            yield format_sse('token', {'text': data})
+        else:
+            if on_complete:
+                on_complete(data)
+            yield format_sse('done', build_response_payload(data))
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def record_handler_timings(timings, handler_start, service='lambda-handler', agent=None):
+    """Add the handler span to a request's timings, record them and emit them as EMF"""
+    agent = agent or get_agent()
+    timings['handler'] = elapsed_ms(handler_start)
+    STAGE_LATENCY.record(timings)
+    if agent.emit_metrics:
+        emit_emf(timings, agent.metrics_namespace, {'Service': service})
+
+
+def timed_headers(headers, stage_timings, handler_start, timings, service='lambda-handler', agent=None):
+    """Attach a Server-Timing header covering pipeline and handler spans"""
+    record_handler_timings(timings, handler_start, service, agent)
+    return {**headers, 'Server-Timing': server_timing_header({**stage_timings, **timings})}
+
+
+def wants_stream(request_headers, body):
+    """A request opts into streaming with {"stream": true} or an SSE Accept header"""
+    accept = next((v for k, v in (request_headers or {}).items() if k.lower() == 'accept'), '')
+    return bool(body.get('stream')) or 'text/event-stream' in accept
+
+
+# Constant response parts, built once per container
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type, Accept',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Expose-Headers': 'Server-Timing',
+    'Timing-Allow-Origin': '*'
+}
+STREAM_HEADERS = {**CORS_HEADERS, 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+NO_INPUT_BODY = fast_json.dumps({'error': 'No input provided'})
+INTERNAL_ERROR_BODY = fast_json.dumps({
+    'error': 'Internal server error',
+    'message': 'I apologize, but I am having technical difficulties. If you are in crisis, please contact emergency services immediately.'
+})
+
+
+COLD_START.mark_imported()
 
 
 # Lambda handler for API Gateway integration
@@ -286,53 +955,73 @@ def lambda_handler(event, context):
     """
     Lambda handler with AgentCore Memory integration
     """
+    cold = COLD_START.begin()
+    # Measured before anything else so agent start-up is charged to the budget
+    deadline = Deadline.from_lambda_context(context)
+    response = _handle_request(event, deadline)
+    # Alerts and the turn's memory event go out before the container is frozen
+    if _agent is not None:
+        _agent.settle(deadline.remaining())
+    COLD_START.finish(cold, event.get('httpMethod'))
+    return response
+
+
+def _handle_request(event, deadline):
+    headers = CORS_HEADERS
     
-    # CORS headers
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Access-Control-Allow-Methods': 'POST, OPTIONS'
-    }
-    
+    # Preflights never touch the agent, boto3 or any client
     if event['httpMethod'] == 'OPTIONS':
         return {'statusCode': 200, 'headers': headers, 'body': ''}
     
+    handler_start = time.perf_counter()
+    
     try:
-        # Initialize agent with memory
-        agent = MentalHealthAgentWithMemory()
+        # Reuse the agent (and its clients) from previous warm invocations
+        agent = get_agent()
         
         # Parse request
-        body = json.loads(event['body'])
+        body = fast_json.loads(event['body'])
         user_input = body.get('input', '')
         session_id = body.get('sessionId', str(uuid.uuid4()))
         actor_id = body.get('userId', 'anonymous_user')
+        timings = {'parse': elapsed_ms(handler_start)}
+        
+        if body.get('action') == 'end_session':
+            agent.end_session(actor_id, session_id)
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': fast_json.dumps({'sessionId': session_id, 'sessionEnded': True})
+            }
         
         if not user_input:
             return {
                 'statusCode': 400,
                 'headers': headers,
-                'body': json.dumps({'error': 'No input provided'})
+                'body': NO_INPUT_BODY
+            }
+        
+        if wants_stream(event.get('headers'), body):
+            # API Gateway REST integrations buffer the body, so the frames are
+            # delivered together here; the container server streams them live.
+            completed = {}
+            stream_body = ''.join(iter_sse_events(agent, user_input, actor_id, session_id,
+                                                  on_complete=completed.update, deadline=deadline))
+            return {
+                'statusCode': 200,
+                'headers': timed_headers(STREAM_HEADERS, completed.get('stage_timings', {}),
+                                         handler_start, timings),
+                'body': stream_body
             }
         
         # Process with memory
-        result = agent.chat_with_memory(user_input, actor_id, session_id)
+        result = agent.chat_with_memory(user_input, actor_id, session_id, deadline)
+        response_body = fast_json.dumps(build_response_payload(result))
         
         return {
             'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'response': result['response'],
-                'sessionId': session_id,
-                'actorId': actor_id,
-                'crisisDetected': result['risk_assessment']['alert_needed'],
-                'riskLevel': result['risk_assessment']['risk_level'],
-                'memoryContext': {
-                    'contextMessages': result['context_used'],
-                    'insights': result['insights_used'],
-                    'memoryId': result['memory_id']
-                },
-                'timestamp': datetime.now().isoformat()
-            })
+            'headers': timed_headers(headers, result['stage_timings'], handler_start, timings),
+            'body': response_body
         }
         
     except Exception as e:
@@ -340,16 +1029,12 @@ def lambda_handler(event, context):
         return {
             'statusCode': 500,
             'headers': headers,
-            'body': json.dumps({
-                'error': 'Internal server error',
-                'message': 'I apologize, but I am having technical difficulties. If you are in crisis, please contact emergency services immediately.'
-            })
+            'body': INTERNAL_ERROR_BODY
         }
 
-
 # Test function
 if __name__ == "__main__":
-    agent = MentalHealthAgentWithMemory()
+    agent = get_agent()
     
     # Test conversation with memory
     actor_id = "test_user_123"
@@ -373,6 +1058,7 @@ if __name__ == "__main__":
         print(f"Risk Level: {result['risk_assessment']['risk_level']}")
         print(f"Context Used: {result['context_used']} messages")
         print(f"Insights Used: {result['insights_used']} insights")
+        print(f"Prompt Tokens: {result['prompt_tokens']}")
         
         if result['risk_assessment']['alert_needed']:
             print("🚨 CRISIS ALERT TRIGGERED!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Risk-aware model routing for the Mental Health Agent
+
+Greetings and short, low-risk questions do not need the full model. The
+router sends them to a configured low-latency model with a reply budget
+scaled to the message, and keeps everything else on the full model.
+Crisis handling is never traded for latency: HIGH and MODERATE risk
+always get the full model with its full reply budget, and so does the
+rest of any session that has been flagged.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from latency_metrics import StageLatencyRecorder
+from prompt_builder import estimate_tokens
+
+RouteDecision = namedtuple('RouteDecision', ['model_id', 'tier', 'max_tokens', 'reason'])
+
+FULL = 'full'
+FAST = 'fast'
+
+ELEVATED_RISK_LEVELS = ('HIGH', 'MODERATE')
+
+
+class ModelRouter:
+    def __init__(self, full_model_id, fast_model_id=None, enabled=True, full_max_tokens=500,
+                 fast_max_tokens=300, min_max_tokens=150, fast_message_tokens=60,
+                 max_escalated_sessions=10000):
+        """
+        fast_message_tokens: longest message (estimated tokens) the fast
+        model may take. Reply budgets grow with the message, between
+        min_max_tokens and the tier's maximum.
+        """
+        self.full_model_id = full_model_id
+        self.fast_model_id = fast_model_id
+        self.enabled = enabled and bool(fast_model_id)
+        self.full_max_tokens = full_max_tokens
+        self.fast_max_tokens = fast_max_tokens
+        self.min_max_tokens = min_max_tokens
+        self.fast_message_tokens = fast_message_tokens
+        self.max_escalated_sessions = max_escalated_sessions
+
+        # Sessions that have seen elevated risk stay on the full model
+        self._escalated = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.decisions = {}
+        self.latency = StageLatencyRecorder()
+
+    def full_route(self, reason='default'):
+        return RouteDecision(self.full_model_id, FULL, self.full_max_tokens, reason)
+
+    def _reply_budget(self, message_tokens, ceiling):
+        """Short messages get short replies; never below min_max_tokens"""
+        return max(self.min_max_tokens, min(ceiling, 100 + 4 * message_tokens))
+
+    def route(self, user_message, risk_assessment, actor_id=None, session_id=None):
+        key = (actor_id, session_id)
+        message_tokens = estimate_tokens(user_message)
+
+        if risk_assessment['risk_level'] in ELEVATED_RISK_LEVELS:
+            self._escalate(key)
+            decision = self.full_route('risk')
+        elif not self.enabled:
+            decision = self.full_route('routing_disabled')
+        elif self._is_escalated(key):
+            decision = self.full_route('escalated_session')
+        elif message_tokens > self.fast_message_tokens:
+            decision = RouteDecision(self.full_model_id, FULL,
+                                     self._reply_budget(message_tokens, self.full_max_tokens), 'long_message')
+        else:
+            decision = RouteDecision(self.fast_model_id, FAST,
+                                     self._reply_budget(message_tokens, self.fast_max_tokens), 'low_risk_short')
+
+        with self._lock:
+            self.decisions[decision.reason] = self.decisions.get(decision.reason, 0) + 1
+        return decision
+
+    def _escalate(self, key):
+        with self._lock:
+            self._escalated[key] = True
+            self._escalated.move_to_end(key)
+            while len(self._escalated) > self.max_escalated_sessions:
+                self._escalated.popitem(last=False)
+
+    def _is_escalated(self, key):
+        with self._lock:
+            return key in self._escalated
+
+    def end_session(self, actor_id, session_id):
+        with self._lock:
+            self._escalated.pop((actor_id, session_id), None)
+
+    def record_latency(self, decision, generation_ms):
+        """Per-model generation latency, keyed by model id"""
+        self.latency.record({decision.model_id: generation_ms})
+
+    def stats(self):
+        with self._lock:
+            decisions = dict(self.decisions)
+            escalated = len(self._escalated)
+        return {
+            'enabled': self.enabled,
+            'decisions': decisions,
+            'escalated_sessions': escalated,
+            'latency': self.latency.snapshot()
+        }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Pre-fork worker processes for the container server
+
+Prompt building, JSON and crisis scanning are CPU work under the GIL, so
+one server process tops out at one core. The supervisor binds the
+listening socket, and the parent does any fork-safe start-up work once
+before forking N workers. Every worker accepts on the inherited socket
+(the kernel spreads connections across them) and runs its own event loop,
+agent, thread pools and boto3 clients.
+
+Workers share no state, and a connection, not a session, picks the
+worker, so one session's turns can land on different workers. Turn
+ordering, the conversation context cache, session summaries and the
+model router's escalations are all per worker: with more than one, turns
+of a session can overlap and read stale context. The server defaults to
+one worker for that reason.
+
+Workers that die are restarted, with a growing delay if they keep dying
+right after start. On SIGTERM every worker is asked to stop accepting and
+finish its in-flight turns; any still running after the grace period are
+killed.
+"""
+
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# A worker that dies sooner than this after starting counts as crash-looping
+MIN_HEALTHY_SECONDS = 10.0
+MAX_RESTART_DELAY_SECONDS = 30.0
+
+
+def bind_socket(host='0.0.0.0', port=8080, backlog=1024):
+    """Listening socket for the workers to share"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def available_cpus():
+    """CPUs this process may run on (respects container cpusets)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class PreforkSupervisor:
+    def __init__(self, run_worker, workers, sock, grace_seconds=30.0):
+        """
+        run_worker(index, sock) runs in each child and returns once the
+        worker has drained; index is stable across restarts, so a
+        replacement picks up whatever its predecessor left on disk.
+        """
+        self.run_worker = run_worker
+        self.workers = workers
+        self.sock = sock
+        self.grace_seconds = grace_seconds
+
+        self._children = {}        # pid -> index
+        self._started_at = {}      # index -> monotonic start time
+        self._restart_delay = {}   # index -> seconds
+        self._stopping = False
+
+        self.restarts = 0
+
+    def _spawn(self, index):
+        # Anything buffered now would otherwise be printed by parent and child
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self.run_worker(index, self.sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                # Skip the parent's atexit handlers and inherited cleanup
+                os._exit(code)
+        self._children[pid] = index
+        self._started_at[index] = time.monotonic()
+        print(f"👷 Started worker {index} (pid {pid})")
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+
+    def run(self):
+        """Fork the workers and supervise them until SIGTERM/SIGINT; returns once all have exited"""
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        print(f"🧑‍🏭 Supervisor pid {os.getpid()} starting {self.workers} workers")
+        for index in range(self.workers):
+            self._spawn(index)
+
+        pending_restarts = {}  # index -> monotonic time to restart at
+        while not self._stopping:
+            for index, restart_at in list(pending_restarts.items()):
+                if time.monotonic() >= restart_at:
+                    del pending_restarts[index]
+                    self._spawn(index)
+                    self.restarts += 1
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = 0, 0
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+
+            index = self._children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+            lived = time.monotonic() - self._started_at[index]
+            if lived < MIN_HEALTHY_SECONDS:
+                delay = min(max(self._restart_delay.get(index, 0.5) * 2, 1.0), MAX_RESTART_DELAY_SECONDS)
+            else:
+                delay = 0.0
+            self._restart_delay[index] = delay
+            print(f"⚠️ Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)} "
+                  f"after {lived:.1f}s; restarting in {delay:.1f}s")
+            pending_restarts[index] = time.monotonic() + delay
+
+        self._shutdown()
+
+    def _shutdown(self):
+        print(f"🛑 Draining {len(self._children)} workers (grace {self.grace_seconds:.0f}s)")
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.grace_seconds
+        while self._children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.1)
+            else:
+                self._children.pop(pid, None)
+
+        for pid in list(self._children):
+            print(f"⚠️ Worker pid {pid} still busy after grace period; killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+        self.sock.close()
+        print("✅ All workers stopped")
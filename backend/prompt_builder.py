@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted prompt assembly for the Mental Health Agent
+
+Prompt size drives both Bedrock latency and cost, so instead of a fixed
+"last 5 messages, top 3 insights" slice we fit as much context and as many
+insights as a configurable token budget allows, dropping the oldest
+messages and least relevant insights first.
+
+The prompt is laid out for Bedrock prompt caching: the static persona and
+guidelines form a cached system block, insights and any rolling session
+summary follow as further system blocks, and history is sent as real
+alternating user/assistant messages with a cache checkpoint on the last
+earlier turn. Between turns of a session the whole prefix up to that
+checkpoint is byte-identical, so Bedrock can read it from cache instead
+of reprocessing it.
+"""
+
+from collections import namedtuple
+
+BuiltPrompt = namedtuple('BuiltPrompt', ['system', 'messages', 'tokens', 'context_used', 'insights_used'])
+
+# Claude's tokenizer averages a little under 4 characters per token on
+# English chat text; erring low keeps us inside the budget
+CHARS_PER_TOKEN = 3.5
+
+# Per-message role/framing overhead in the Messages API
+MESSAGE_OVERHEAD_TOKENS = 4
+
+CACHE_CHECKPOINT = {"type": "ephemeral"}
+
+INSIGHTS_HEADER = "User insights from previous conversations:"
+
+SUMMARY_HEADER = "Summary of earlier conversation in this session:"
+
+SYSTEM_PROMPT = """You are a compassionate mental health support agent. Provide empathetic, supportive responses.
+
+Please respond with empathy and support. Guidelines:
+- Be warm and non-judgmental
+- Reference previous conversation context when relevant
+- Adapt to user's communication style from insights
+- Ask thoughtful follow-up questions
+- Validate their feelings
+- Encourage professional help when appropriate
+- Provide hope and support
+- Keep responses concise but meaningful"""
+
+_ROLES = {'USER': 'user', 'ASSISTANT': 'assistant'}
+
+
+def estimate_tokens(text):
+    """Fast local token estimate; no tokenizer download needed"""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _insight_line(insight):
+    return f"- {insight.get('content', '')}"
+
+
+def _text_block(text, checkpoint=False):
+    block = {"type": "text", "text": text}
+    if checkpoint:
+        block["cache_control"] = CACHE_CHECKPOINT
+    return block
+
+
+def _alternating_messages(history, user_message, caching):
+    """
+    Turn (role, text) history plus the current message into the strictly
+    alternating user/assistant list the Messages API requires: consecutive
+    same-role messages are merged and the list always opens with a user turn.
+    """
+    messages = []
+    for role, text in history:
+        if not messages and role != 'user':
+            continue
+        if messages and messages[-1]['role'] == role:
+            messages[-1]['content'].append(_text_block(text))
+        else:
+            messages.append({'role': role, 'content': [_text_block(text)]})
+
+    # Everything up to here is the same next turn, so checkpoint it
+    if caching and messages:
+        messages[-1]['content'][-1]['cache_control'] = CACHE_CHECKPOINT
+
+    if messages and messages[-1]['role'] == 'user':
+        messages[-1]['content'].append(_text_block(user_message))
+    else:
+        messages.append({'role': 'user', 'content': [_text_block(user_message)]})
+    return messages
+
+
+class PromptBuilder:
+    def __init__(self, token_budget=2000, insights_share=0.3, caching=True):
+        """
+        token_budget: upper bound on prompt tokens.
+        insights_share: fraction of the flexible budget reserved for
+        long-term insights; whatever they leave unused goes to context.
+        caching: add Bedrock prompt-cache checkpoints.
+        """
+        self.token_budget = token_budget
+        self.insights_share = insights_share
+        self.caching = caching
+        self.system_tokens = estimate_tokens(SYSTEM_PROMPT)
+
+    def _select_insights(self, insights, budget):
+        """Most relevant first; retrieve_memories already returns them ranked"""
+        if any('score' in insight for insight in insights):
+            insights = sorted(insights, key=lambda i: i.get('score', 0), reverse=True)
+
+        lines = []
+        used = 0
+        for insight in insights:
+            line = _insight_line(insight)
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                continue
+            lines.append(line)
+            used += cost
+        return lines, used
+
+    def _select_context(self, context, budget):
+        """Newest ContextMessages first, stopping at the first one that does not fit"""
+        selected = []
+        used = 0
+        for message in reversed(context):
+            role = _ROLES.get(message.role)
+            if role is None:
+                continue
+            cost = estimate_tokens(message.message) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget:
+                break
+            selected.append((role, message.message))
+            used += cost
+        selected.reverse()
+        return selected, used
+
+    def build(self, user_message, context, insights, summary=None):
+        """
+        context: ContextMessages oldest first. summary: rolling summary of
+        the session's turns before context, if there is one.
+        """
+        summary_block = SUMMARY_HEADER + "\n" + summary if summary else None
+        summary_tokens = estimate_tokens(summary_block) if summary_block else 0
+        fixed_tokens = (self.system_tokens + estimate_tokens(INSIGHTS_HEADER) + summary_tokens
+                        + estimate_tokens(user_message) + MESSAGE_OVERHEAD_TOKENS)
+        flexible = max(self.token_budget - fixed_tokens, 0)
+
+        insight_lines, insight_tokens = self._select_insights(
+            insights, int(flexible * self.insights_share))
+        history, context_tokens = self._select_context(
+            context, flexible - insight_tokens)
+
+        system = [_text_block(SYSTEM_PROMPT, checkpoint=self.caching)]
+        if insight_lines:
+            system.append(_text_block(INSIGHTS_HEADER + "\n" + "\n".join(insight_lines)))
+        if summary_block:
+            system.append(_text_block(summary_block))
+
+        messages = _alternating_messages(history, user_message, self.caching)
+
+        tokens = (self.system_tokens + context_tokens + summary_tokens + estimate_tokens(user_message)
+                  + MESSAGE_OVERHEAD_TOKENS)
+        if insight_lines:
+            tokens += estimate_tokens(system[1]['text'])
+
+        # Leading assistant turns may have been dropped; count what was sent
+        context_used = sum(len(message['content']) for message in messages) - 1
+
+        return BuiltPrompt(system, messages, tokens, context_used, len(insight_lines))
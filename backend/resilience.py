@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Circuit breakers and hedged reads for the agent's AWS dependencies
+
+A degraded dependency should cost a turn milliseconds, not a full botocore
+timeout and retry cycle. CircuitBreaker fails calls fast once the recent
+failure rate crosses a threshold and lets a single probe through after a
+cool-down. HedgedCall bounds idempotent reads with a deadline and, once a
+read has taken longer than the recent latency percentile, fires a
+duplicate and takes whichever answer comes back first.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+
+class DependencyTimeout(Exception):
+    """Raised when a guarded read misses its deadline"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_rate=0.5, min_calls=5, window_seconds=30.0, open_seconds=15.0):
+        """
+        The breaker opens when, over the last window_seconds, at least
+        min_calls were made and failure_rate of them failed. After
+        open_seconds one probe call is allowed; its outcome closes or
+        re-opens the breaker.
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+        self._outcomes = deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self):
+        """Whether a call may go ahead right now; claims the half-open probe"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == self.HALF_OPEN:
+                print(f"🟢 Circuit {self.name} closed")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._add_outcome(now, True)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.HALF_OPEN:
+                self._trip(now)
+                return
+            if state == self.OPEN:
+                # A straggler from before the trip; the breaker already knows
+                return
+            self._add_outcome(now, False)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._trip(now)
+
+    def _add_outcome(self, now, ok):
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _trip(self, now):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        self.trips += 1
+        print(f"🔴 Circuit {self.name} opened; failing fast for {self.open_seconds:.0f}s")
+
+    def call(self, func, *args, **kwargs):
+        """Run func through the breaker; raises CircuitOpenError when open"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'state': self._current_state(now),
+                'recent_calls': len(self._outcomes),
+                'recent_failures': sum(1 for _, ok in self._outcomes if not ok),
+                'trips': self.trips,
+                'rejected': self.rejected
+            }
+
+
+class HedgedCall:
+    """
+    Deadline-bounded, hedged execution of idempotent reads.
+
+    The hedge delay tracks the given percentile of recent successful
+    latencies, so only the slowest few percent of reads are duplicated.
+    Until enough samples exist the delay is max_hedge_seconds.
+    """
+
+    def __init__(self, executor, timeout_seconds=1.5, percentile=95, min_hedge_seconds=0.02,
+                 max_hedge_seconds=0.5, window=200, min_samples=20):
+        self.executor = executor
+        self.timeout_seconds = timeout_seconds
+        self.percentile = percentile
+        self.min_hedge_seconds = min_hedge_seconds
+        self.max_hedge_seconds = max_hedge_seconds
+        self.min_samples = min_samples
+
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def hedge_delay(self):
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.max_hedge_seconds
+            ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)
+        return min(max(ordered[index], self.min_hedge_seconds), self.max_hedge_seconds)
+
+    def call(self, func, timeout_seconds=None, **kwargs):
+        """
+        Return the first successful result; raises DependencyTimeout past
+        the deadline. timeout_seconds overrides the default for one call.
+        """
+        timeout_seconds = self.timeout_seconds if timeout_seconds is None else timeout_seconds
+        start = time.monotonic()
+        deadline = start + timeout_seconds
+        primary = self.executor.submit(func, **kwargs)
+        pending = {primary}
+
+        done, _ = wait(pending, timeout=min(self.hedge_delay(), timeout_seconds))
+        if not done:
+            pending.add(self.executor.submit(func, **kwargs))
+            with self._lock:
+                self.hedges += 1
+
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                with self._lock:
+                    self._latencies.append(time.monotonic() - start)
+                    if future is not primary:
+                        self.hedge_wins += 1
+                return future.result()
+
+        if error is not None and not pending:
+            raise error
+        # Stragglers finish on the executor; their results are dropped
+        with self._lock:
+            self.timeouts += 1
+        raise DependencyTimeout(f"no response within {timeout_seconds:.2f}s")
+
+    def stats(self):
+        with self._lock:
+            return {'hedges': self.hedges, 'hedge_wins': self.hedge_wins, 'timeouts': self.timeouts}
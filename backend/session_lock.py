@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Per-session turn ordering
+
+Two quick messages in one session used to run chat_with_memory side by
+side: their USER/ASSISTANT writes interleaved and each turn's context was
+missing the other's reply. SessionLocks serializes turns per (actor,
+session) in arrival order while turns of different sessions never wait
+on each other.
+
+There is no global lock. Keys are spread over striped registries whose
+mutexes are only held for dictionary bookkeeping, never while a turn
+runs or waits. The lock passes straight from one turn to the next
+waiter, and a key's entry is dropped as soon as no turn holds or awaits
+it, so memory is bounded by the sessions in flight.
+
+AsyncSessionLocks gives the same ordering on an event loop, so the
+container server can order a session's turns before they take a turn
+slot or a thread. Both only order turns within one process: concurrent
+Lambda invocations run in separate containers, and pre-forked server
+workers (SERVER_WORKERS above 1) get no session affinity, so neither is
+serialized.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class _SessionEntry:
+    __slots__ = ('held', 'waiters', 'refs')
+
+    def __init__(self):
+        self.held = False
+        self.waiters = deque()
+        self.refs = 0
+
+
+class SessionLocks:
+    def __init__(self, stripes=64):
+        self._stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+
+        self.waits = 0
+        self.timeouts = 0
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def acquire(self, key, timeout=None):
+        """
+        Wait (FIFO) for the key; True once held, False if timeout seconds
+        pass first. Every True must be paired with release(key).
+        """
+        mutex, entries = self._stripe(key)
+        with mutex:
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = _SessionEntry()
+            entry.refs += 1
+            if not entry.held:
+                entry.held = True
+                return True
+            turn = threading.Event()
+            entry.waiters.append(turn)
+            self.waits += 1
+
+        if turn.wait(timeout):
+            return True
+        with mutex:
+            if turn.is_set():
+                # Handed to us just as we gave up
+                return True
+            entry.waiters.remove(turn)
+            self._unref(entries, key, entry)
+            self.timeouts += 1
+        return False
+
+    def release(self, key):
+        """Pass the key to the next waiting turn, or free it"""
+        mutex, entries = self._stripe(key)
+        with mutex:
+            entry = entries[key]
+            if entry.waiters:
+                entry.waiters.popleft().set()
+            else:
+                entry.held = False
+            self._unref(entries, key, entry)
+
+    @staticmethod
+    def _unref(entries, key, entry):
+        entry.refs -= 1
+        if entry.refs == 0:
+            del entries[key]
+
+    @contextmanager
+    def hold(self, key, timeout=None):
+        """
+        Run the block with the key held and yield the milliseconds spent
+        waiting. After timeout the block runs anyway, unordered: a late
+        reply is worse than the race.
+        """
+        start = time.perf_counter()
+        held = self.acquire(key, timeout)
+        waited_ms = round((time.perf_counter() - start) * 1000, 2)
+        if not held:
+            print(f"⚠️ Session {key} still busy after {waited_ms:.0f}ms; running this turn unordered")
+        try:
+            yield waited_ms
+        finally:
+            if held:
+                self.release(key)
+
+    def active_keys(self):
+        total = 0
+        for mutex, entries in self._stripes:
+            with mutex:
+                total += len(entries)
+        return total
+
+    def stats(self):
+        return {'active_sessions': self.active_keys(), 'waits': self.waits, 'timeouts': self.timeouts}
+
+
+class AsyncSessionLocks:
+    """SessionLocks for turns served on one event loop; not thread-safe"""
+
+    def __init__(self):
+        # key -> futures of the turns waiting for it; present while held
+        self._waiters = {}
+
+        self.waits = 0
+        self.timeouts = 0
+
+    async def acquire(self, key, timeout=None):
+        """Wait (FIFO) for the key; True once held, False if timeout seconds pass first"""
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            self._waiters[key] = deque()
+            return True
+        turn = asyncio.get_running_loop().create_future()
+        waiters.append(turn)
+        self.waits += 1
+
+        try:
+            done, _ = await asyncio.wait({turn}, timeout=timeout)
+        except asyncio.CancelledError:
+            self._abandon(key, turn)
+            raise
+        if done:
+            return True
+        self._abandon(key, turn)
+        self.timeouts += 1
+        return False
+
+    def _abandon(self, key, turn):
+        if turn.done() and not turn.cancelled():
+            # Handed to us just as we gave up
+            self.release(key)
+        else:
+            turn.cancel()
+            self._waiters[key].remove(turn)
+
+    def release(self, key):
+        """Pass the key to the next waiting turn, or free it"""
+        waiters = self._waiters[key]
+        while waiters:
+            turn = waiters.popleft()
+            if not turn.done():
+                turn.set_result(None)
+                return
+        del self._waiters[key]
+
+    @asynccontextmanager
+    async def hold(self, key, timeout=None):
+        """Async counterpart of SessionLocks.hold"""
+        start = time.perf_counter()
+        held = await self.acquire(key, timeout)
+        waited_ms = round((time.perf_counter() - start) * 1000, 2)
+        if not held:
+            print(f"⚠️ Session {key} still busy after {waited_ms:.0f}ms; running this turn unordered")
+        try:
+            yield waited_ms
+        finally:
+            if held:
+                self.release(key)
+
+    def turns(self):
+        """Turns holding or waiting for a session"""
+        return sum(1 + len(waiters) for waiters in self._waiters.values())
+
+    def stats(self):
+        return {'active_sessions': len(self._waiters), 'waits': self.waits, 'timeouts': self.timeouts}
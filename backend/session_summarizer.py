@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Rolling summaries for long conversation sessions
+
+Crisis-support sessions can run for dozens of turns. Rather than dropping
+old turns once they no longer fit the prompt, every K turns the messages
+older than a short tail are folded into a running summary by a
+background model call. Later turns send the summary plus the
+unsummarized tail, so prompt size stays flat however long a session runs.
+
+The summary is stored in the session itself as an OTHER-role event
+carrying a marker, so any container reading the session with list_events
+picks it up along with how many older messages it does not cover yet.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from fast_json import anthropic_request_body
+from prompt_builder import estimate_tokens
+
+SUMMARY_MARKER = '[session-summary]'
+SUMMARY_ROLE = 'OTHER'
+
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a mental health support conversation for the counselor who continues it.
+Merge the new messages into the previous summary. Keep: what the user is struggling with, feelings they expressed, risk signals, coping strategies discussed and how they landed, commitments or next steps, and the user's communication preferences.
+Write plain prose in the third person, under 200 words. Do not add advice."""
+
+
+def encode_summary(summary, tail):
+    """Message text for the stored summary event"""
+    return SUMMARY_MARKER + json.dumps({'summary': summary, 'tail': tail})
+
+
+def decode_summary(text):
+    """(summary, tail) from a stored summary message, or None if it is not one"""
+    if not text.startswith(SUMMARY_MARKER):
+        return None
+    try:
+        record = json.loads(text[len(SUMMARY_MARKER):])
+        return record['summary'], int(record['tail'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def summary_request(previous_summary, messages, max_tokens):
+    """Bedrock request body that folds messages into previous_summary"""
+    transcript = '\n'.join(f"{message.role}: {message.message}" for message in messages)
+    return anthropic_request_body(max_tokens, SUMMARY_INSTRUCTIONS, [{
+        "role": "user",
+        "content": f"Previous summary:\n{previous_summary or '(none yet)'}\n\nNew messages:\n{transcript}"
+    }])
+
+
+class _SessionState:
+    __slots__ = ('summary', 'pending', 'folding')
+
+    def __init__(self, summary=None, pending=None):
+        self.summary = summary
+        # Messages not yet covered by the summary, oldest first
+        self.pending = list(pending or [])
+        self.folding = False
+
+
+class SessionSummarizer:
+    def __init__(self, summarize_func, persist_func, executor, every_turns=4, tail_messages=6,
+                 max_sessions=10000):
+        """
+        summarize_func(previous_summary, messages) -> new summary text; raises on failure.
+        persist_func(actor_id, session_id, messages) stores (text, role) pairs in the session.
+        Once tail_messages + 2 * every_turns messages are unsummarized,
+        all but the last tail_messages are folded in the background.
+        """
+        self.summarize_func = summarize_func
+        self.persist_func = persist_func
+        self.executor = executor
+        self.every_turns = every_turns
+        self.tail_messages = tail_messages
+        self.max_sessions = max_sessions
+
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.folds = 0
+        self.fold_failures = 0
+
+    @property
+    def max_unsummarized(self):
+        """Most messages a prompt ever needs next to the summary"""
+        return self.tail_messages + 2 * self.every_turns
+
+    # Read side
+
+    def view(self, actor_id, session_id):
+        """(summary, unsummarized message count); (None, None) when there is no summary"""
+        with self._lock:
+            state = self._sessions.get((actor_id, session_id))
+            if state is None or state.summary is None:
+                return None, None
+            return state.summary, len(state.pending)
+
+    def seed(self, actor_id, session_id, summary, unsummarized):
+        """
+        Adopt what list_events returned for a session this process has not
+        seen: the stored summary (or None) and the messages after it.
+        """
+        key = (actor_id, session_id)
+        with self._lock:
+            if key in self._sessions:
+                return
+            self._sessions[key] = _SessionState(summary, unsummarized)
+            self._trim_sessions()
+
+    # Write side
+
+    def record_turn(self, actor_id, session_id, messages):
+        """Note a stored turn; starts a background fold every K turns"""
+        key = (actor_id, session_id)
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is None:
+                state = self._sessions[key] = _SessionState()
+                self._trim_sessions()
+            self._sessions.move_to_end(key)
+            state.pending.extend(messages)
+
+            if state.folding or len(state.pending) < self.max_unsummarized:
+                return
+            # If folds keep failing, fall back to dropping the oldest turns
+            overflow = len(state.pending) - 4 * self.max_unsummarized
+            if overflow > 0:
+                del state.pending[:overflow]
+            state.folding = True
+            previous = state.summary
+            to_fold = state.pending[:-self.tail_messages]
+
+        self.executor.submit(self._fold, key, previous, to_fold)
+
+    def _fold(self, key, previous, to_fold):
+        actor_id, session_id = key
+        try:
+            summary = self.summarize_func(previous, to_fold)
+        except Exception as e:
+            print(f"⚠️ Session summary failed, will retry next turn: {str(e)}")
+            with self._lock:
+                self.fold_failures += 1
+                state = self._sessions.get(key)
+                if state is not None:
+                    state.folding = False
+            return
+
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is None:
+                # Session ended while we were summarizing
+                return
+            del state.pending[:len(to_fold)]
+            state.summary = summary
+            state.folding = False
+            self.folds += 1
+            # A turn stored while we fold may land before the summary event;
+            # counting one extra turn means readers overlap rather than miss it
+            tail = len(state.pending) + 2
+
+        self.persist_func(actor_id, session_id, [(encode_summary(summary, tail), SUMMARY_ROLE)])
+        print(f"🗜️ Folded {len(to_fold)} messages into session summary "
+              f"(~{estimate_tokens(summary)} tokens)")
+
+    def end_session(self, actor_id, session_id):
+        with self._lock:
+            self._sessions.pop((actor_id, session_id), None)
+
+    def _trim_sessions(self):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'folds': self.folds,
+                    'fold_failures': self.fold_failures}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Crash-safe local spool of JSON records
+
+Each Spool writes into its own subdirectory of the spool root and holds an
+flock on it for as long as it is open. A directory whose lock can be taken
+belongs to a process (or buffer) that is gone, so its records are orphans:
+claim_orphans() moves them into this spool's directory with an atomic
+rename before reading them. Only one claimant's rename can succeed, so
+every orphaned record is picked up exactly once, and records a live owner
+is still working on are never touched.
+"""
+
+import fcntl
+import json
+import os
+import uuid
+
+LOCK_NAME = '.owner.lock'
+
+
+class Spool:
+    def __init__(self, root):
+        self.root = root
+        owner = uuid.uuid4().hex
+        self.path = os.path.join(root, owner)
+        # Locked before it gets its visible name, so no claimant ever sees
+        # it unlocked; the kernel releases the lock however the process dies
+        staging_path = os.path.join(root, f".{owner}")
+        os.makedirs(staging_path)
+        self._lock = open(os.path.join(staging_path, LOCK_NAME), 'w')
+        fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.rename(staging_path, self.path)
+
+    def _record_path(self, record_id):
+        return os.path.join(self.path, f"{record_id}.json")
+
+    def write(self, record_id, record):
+        path = self._record_path(record_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def remove(self, record_id):
+        try:
+            os.remove(self._record_path(record_id))
+        except FileNotFoundError:
+            pass
+
+    def claim_orphans(self, label):
+        """Take over every record no live spool owns; returns them as dicts"""
+        records = []
+        # Records written straight into the root predate per-owner directories
+        self._claim_from(self.root, records, label)
+        for name in os.listdir(self.root):
+            owner_path = os.path.join(self.root, name)
+            if (name.startswith('.') or owner_path == self.path
+                    or not os.path.isfile(os.path.join(owner_path, LOCK_NAME))):
+                continue
+            try:
+                lock = open(os.path.join(owner_path, LOCK_NAME))
+            except FileNotFoundError:
+                continue
+            with lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                self._claim_from(owner_path, records, label)
+                try:
+                    for leftover in os.listdir(owner_path):
+                        # Half-written records and the lock itself
+                        os.remove(os.path.join(owner_path, leftover))
+                    os.rmdir(owner_path)
+                except OSError:
+                    pass
+        return records
+
+    def _claim_from(self, directory, records, label):
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            claimed_path = os.path.join(self.path, name)
+            try:
+                os.rename(os.path.join(directory, name), claimed_path)
+            except FileNotFoundError:
+                # Another spool claimed it first
+                continue
+            try:
+                with open(claimed_path) as f:
+                    records.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Skipping unreadable {label} {name}: {str(e)}")
+
+    def close(self):
+        """Give up ownership; records still on disk are orphans for the next spool"""
+        if self._lock.closed:
+            return
+        try:
+            if os.listdir(self.path) == [LOCK_NAME]:
+                os.remove(os.path.join(self.path, LOCK_NAME))
+                os.rmdir(self.path)
+        except OSError:
+            pass
+        self._lock.close()
@@ -325,15 +325,26 @@ class ChatPortal {
             const context = this.getLocalContext();
             this.debug.log('INFO', `Context prepared: ${context.length} previous messages`);
             
-            // Call AgentCore Runtime with JWT
+            // Call AgentCore Runtime with JWT, rendering tokens as they stream in
             this.debug.log('INFO', 'Calling AgentCore Runtime...');
-            const response = await this.callAgentCoreRuntime(message, context);
+            let streamingBubble = null;
+            const response = await this.callAgentCoreRuntime(message, context, (text) => {
+                if (!streamingBubble) {
+                    this.hideTypingIndicator();
+                    streamingBubble = this.addStreamingMessage('agent');
+                }
+                this.appendToStreamingMessage(streamingBubble, text);
+            });
             
             // Remove typing indicator
             this.hideTypingIndicator();
             
             // Add agent response to chat
-            this.addMessage(response.response, 'agent');
+            if (streamingBubble) {
+                this.finishStreamingMessage(streamingBubble, response.response, 'agent');
+            } else {
+                this.addMessage(response.response, 'agent');
+            }
             this.debug.log('SUCCESS', 'Agent response received and displayed');
             
             this.updateStatus('online', 'Connected - Ready to Chat');
@@ -360,7 +371,7 @@ class ChatPortal {
         }
     }
     
-    async callAgentCoreRuntime(message, context) {
+    async callAgentCoreRuntime(message, context, onToken) {
         if (!this.jwtToken) {
             throw new Error('No JWT token available');
         }
@@ -369,7 +380,8 @@ class ChatPortal {
             input: message,
             sessionId: this.sessionId,
             actorId: this.userId,
-            context: context
+            context: context,
+            stream: true
         };
         
         const url = `${this.config.agentCoreEndpoint}/runtimes/${encodeURIComponent(this.config.runtimeArn)}/invocations`;
@@ -385,6 +397,7 @@ class ChatPortal {
             headers: {
                 'Authorization': `Bearer ${this.jwtToken}`,
                 'Content-Type': 'application/json',
+                'Accept': 'text/event-stream, application/json',
                 'X-Amzn-Bedrock-AgentCore-Runtime-Session-Id': this.sessionId
             },
             body: JSON.stringify(payload)
@@ -394,18 +407,91 @@ class ChatPortal {
         this.debug.log('INFO', `AgentCore response time: ${responseTime}ms`);
         this.debug.log('INFO', `Response status: ${response.status}`);
         
+        const serverTiming = response.headers.get('Server-Timing');
+        if (serverTiming) {
+            this.debug.log('INFO', `Server timing: ${serverTiming}`);
+        }
+        
         if (!response.ok) {
             const errorText = await response.text();
             this.debug.log('ERROR', `AgentCore error: ${response.status} - ${errorText}`);
             throw new Error(`HTTP ${response.status}: ${errorText}`);
         }
         
+        const contentType = response.headers.get('Content-Type') || '';
+        if (contentType.includes('text/event-stream') && response.body) {
+            return this.readEventStream(response, startTime, onToken);
+        }
+        
         const result = await response.json();
         this.debug.log('SUCCESS', `AgentCore response received (${JSON.stringify(result).length} bytes)`);
         
         return result;
     }
     
+    async readEventStream(response, startTime, onToken) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+        let firstTokenLogged = false;
+        
+        const handleFrame = (frame) => {
+            let eventType = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) {
+                    eventType = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            }
+            if (!data) {
+                return;
+            }
+            
+            const parsed = JSON.parse(data);
+            if (eventType === 'token') {
+                if (!firstTokenLogged) {
+                    firstTokenLogged = true;
+                    this.debug.log('INFO', `AgentCore time to first token: ${Date.now() - startTime}ms`);
+                }
+                if (onToken) {
+                    onToken(parsed.text);
+                }
+            } else if (eventType === 'done') {
+                result = parsed;
+            } else if (eventType === 'error') {
+                throw new Error(parsed.message || 'Stream error');
+            }
+        };
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary = buffer.indexOf('\n\n');
+            while (boundary !== -1) {
+                handleFrame(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                boundary = buffer.indexOf('\n\n');
+            }
+        }
+        if (buffer.trim()) {
+            handleFrame(buffer);
+        }
+        
+        if (!result) {
+            throw new Error('Stream ended without a final response');
+        }
+        
+        this.debug.log('SUCCESS', `AgentCore stream completed in ${Date.now() - startTime}ms`);
+        return result;
+    }
+    
     getLocalContext() {
         const context = this.messageHistory.slice(-6).map(msg => ({
             role: msg.sender === 'user' ? 'USER' : 'ASSISTANT',
@@ -453,6 +539,56 @@ class ChatPortal {
         this.debug.log('INFO', `Message added (${sender}): ${text.length} characters`);
     }
     
+    addStreamingMessage(sender) {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `message ${sender}-message`;
+        
+        const bubbleDiv = document.createElement('div');
+        bubbleDiv.className = 'message-bubble';
+        bubbleDiv.textContent = '';
+        
+        const timeDiv = document.createElement('div');
+        timeDiv.className = 'message-time';
+        timeDiv.textContent = new Date().toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'});
+        
+        messageDiv.appendChild(bubbleDiv);
+        messageDiv.appendChild(timeDiv);
+        
+        if (this.chatMessages) {
+            this.chatMessages.appendChild(messageDiv);
+            this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+        }
+        
+        this.debug.log('INFO', `Streaming message started (${sender})`);
+        return bubbleDiv;
+    }
+    
+    appendToStreamingMessage(bubbleDiv, text) {
+        bubbleDiv.textContent += text;
+        if (this.chatMessages) {
+            this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+        }
+    }
+    
+    finishStreamingMessage(bubbleDiv, text, sender) {
+        bubbleDiv.textContent = text;
+        
+        // Store in message history
+        this.messageHistory.push({
+            text: text,
+            sender: sender,
+            timestamp: new Date().toISOString()
+        });
+        
+        // Keep only last 20 messages in memory
+        if (this.messageHistory.length > 20) {
+            this.messageHistory = this.messageHistory.slice(-20);
+            this.debug.log('INFO', 'Message history trimmed to 20 messages');
+        }
+        
+        this.debug.log('INFO', `Message added (${sender}, streamed): ${text.length} characters`);
+    }
+    
     showTypingIndicator() {
         const typingDiv = document.createElement('div');
         typingDiv.className = 'message agent-message typing-message';
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Crisis Detection Microbenchmark
+Compares the old per-keyword substring loop with the precompiled
+trie-compiled lexicon on long pasted messages and growing keyword lists,
+after checking that the agent's lexicon still flags every phrase the old
+loop flagged, inflected forms included (exit 1 otherwise).
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from crisis_lexicon import CrisisLexicon
+from mental_health_agent_with_memory import CRISIS_KEYWORDS, CRISIS_TIERS, MODERATE_KEYWORDS
+
+BASE_HIGH = list(CRISIS_KEYWORDS)
+BASE_MODERATE = list(MODERATE_KEYWORDS)
+
+# (message, tier the agent must assign); the old substring loop caught
+# every one of these, inflections included
+RECALL_CHECKS = [
+    ("I overdosed last night", 'HIGH'),
+    ("I keep thinking about overdosing", 'HIGH'),
+    ("The hopelessness never lifts", 'HIGH'),
+    ("I feel hopelessly stuck", 'HIGH'),
+    ("I'm just a burden to everyone", 'HIGH'),
+    ("I can’t go on like this", 'HIGH'),
+    ("I was panicking all morning", 'MODERATE'),
+    ("I panicked at work again", 'MODERATE'),
+    ("Panic attacks every night", 'MODERATE'),
+    ("I feel so alone", 'MODERATE'),
+    ("What a lovely sunny day", None),
+]
+
+FILLER = (
+    "I have been thinking a lot about work and my family lately and it is "
+    "hard to sleep some nights because everything feels like too much "
+).split()
+
+
+def synthetic_lexicon(size, rng):
+    """Pad the real lexicon with plausible multi-word phrases"""
+    keywords = list(BASE_HIGH)
+    while len(keywords) < size:
+        keywords.append(' '.join(rng.choice(FILLER) + str(rng.randint(0, 999))
+                                 for _ in range(rng.randint(1, 3))))
+    return keywords
+
+
+def synthetic_message(length, rng):
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(FILLER))
+    words.insert(len(words) // 2, 'hopeless')
+    return ' '.join(words)
+
+
+def naive_detect(message, high, moderate):
+    """The original detect_crisis matching loop"""
+    message_lower = message.lower()
+    detected = [kw for kw in high if kw in message_lower]
+    if detected:
+        return detected
+    moderate_keywords = list(moderate)  # rebuilt per call, as before
+    return [kw for kw in moderate_keywords if kw in message_lower]
+
+
+def check_recall():
+    """Return the RECALL_CHECKS the agent's lexicon gets wrong"""
+    lexicon = CrisisLexicon.shared(CRISIS_TIERS)
+    failures = []
+    for message, expected in RECALL_CHECKS:
+        tiers = [name for name, matches in lexicon.matches_by_tier(message).items() if matches]
+        found = tiers[0] if tiers else None
+        if found != expected:
+            failures.append((message, expected, found))
+    return failures
+
+
+def time_per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    rng = random.Random(42)
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print("🔍 CRISIS DETECTION MICROBENCHMARK")
+    print("=" * 72)
+    failures = check_recall()
+    for message, expected, found in failures:
+        print(f"❌ {message!r}: expected {expected}, got {found}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Recall checks: {len(RECALL_CHECKS)} phrases tiered as expected")
+    print("-" * 72)
+    print(f"{'keywords':>9} {'message':>9} {'naive µs':>12} {'lexicon µs':>14} {'speedup':>9}")
+    print("-" * 72)
+
+    for lexicon_size in (24, 100, 500):
+        high = synthetic_lexicon(lexicon_size - len(BASE_MODERATE), rng)
+        build_start = time.perf_counter()
+        lexicon = CrisisLexicon([('HIGH', high), ('MODERATE', BASE_MODERATE)])
+        build_ms = (time.perf_counter() - build_start) * 1000
+
+        for message_length in (200, 2_000, 20_000):
+            message = synthetic_message(message_length, rng)
+            naive = time_per_call(lambda: naive_detect(message, high, BASE_MODERATE), iterations)
+            compiled = time_per_call(lambda: lexicon.matches_by_tier(message), iterations)
+            print(f"{lexicon_size:>9} {message_length:>9} {naive:>12.1f} {compiled:>14.1f} "
+                  f"{naive / compiled:>8.1f}x")
+
+        print(f"{'':>9} lexicon compile: {build_ms:.2f} ms ({len(lexicon.keyword_tiers)} keywords)")
+
+    print("=" * 72)
+    print("✅ Lexicon cost is one pass over the message and stays flat as keywords grow")
+
+
+if __name__ == "__main__":
+    main()
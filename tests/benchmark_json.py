@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization Microbenchmark
+Compares the stdlib json calls the request path used to make against the
+fast_json layer (orjson when installed, compact stdlib otherwise) on
+realistic payloads: the API Gateway body, a full Bedrock request built by
+the prompt builder, a turn's worth of streamed model chunks, and the
+response payload.
+
+    python benchmark_json.py [iterations] [--no-orjson]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+if '--no-orjson' in sys.argv:
+    sys.modules['orjson'] = None  # makes `import orjson` raise ImportError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import fast_json
+from memory_events import ContextMessage
+from prompt_builder import PromptBuilder
+
+REPLY = ("Thank you for sharing that with me. It sounds like you're carrying a lot right now, and it "
+         "makes sense to feel overwhelmed. What has been weighing on you the most today? ") * 2
+
+
+def make_payloads():
+    request_body = json.dumps({
+        'input': "I've been feeling really stressed about work and I can't sleep. " * 3,
+        'userId': 'user-3f2a9c1e-7b4d-4c1a-9e2f-0a1b2c3d4e5f',
+        'sessionId': '9b7e6d5c-4a3b-2c1d-0e9f-8a7b6c5d4e3f',
+        'stream': False
+    })
+
+    context = []
+    for i in range(10):
+        context.append(ContextMessage(f"Message {i}: work has been hard, my manager keeps adding deadlines "
+                                      f"and I feel like I'm falling behind on everything.", 'USER'))
+        context.append(ContextMessage(f"Reply {i}: {REPLY}", 'ASSISTANT'))
+    insights = [{'content': 'Prefers short, practical suggestions', 'score': 0.9},
+                {'content': 'Finds box breathing helpful when anxious', 'score': 0.8},
+                {'content': 'Works night shifts as a nurse', 'score': 0.7}]
+    prompt = PromptBuilder(token_budget=2000).build("I still can't switch off at night.", context, insights)
+
+    chunks = [{'type': 'message_start', 'message': {'role': 'assistant', 'usage': {'input_tokens': 1900}}}]
+    chunks += [{'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': ' ' + word}}
+               for word in REPLY.split()]
+    chunks += [{'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}, 'usage': {'output_tokens': 80}}]
+    chunk_bytes = [json.dumps(chunk).encode('utf-8') for chunk in chunks]
+
+    response = {
+        'response': REPLY,
+        'sessionId': '9b7e6d5c-4a3b-2c1d-0e9f-8a7b6c5d4e3f',
+        'actorId': 'user-3f2a9c1e-7b4d-4c1a-9e2f-0a1b2c3d4e5f',
+        'crisisDetected': False,
+        'riskLevel': 'LOW',
+        'memoryContext': {'contextMessages': 20, 'insights': 3, 'promptTokens': 1874,
+                          'memoryId': 'MentalHealthChatbotMemory-GqmjCf2KIw'},
+        'dependencies': {'memory': 'closed', 'bedrock': 'closed'},
+        'modelUsage': {'inputTokens': 1900, 'outputTokens': 80, 'cacheReadInputTokens': 1500,
+                       'cacheWriteInputTokens': 0},
+        'model': {'id': 'anthropic.claude-3-5-haiku-20241022-v1:0', 'tier': 'fast', 'reason': 'low_risk_short'},
+        'timestamp': '2026-01-01T12:00:00.000000'
+    }
+    return request_body, prompt, chunk_bytes, response
+
+
+def cases(request_body, prompt, chunk_bytes, response):
+    def old_request_body():
+        # botocore encodes a str body to bytes before sending, so count it here
+        return json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 500,
+            "system": prompt.system,
+            "messages": prompt.messages
+        }).encode('utf-8')
+
+    return [
+        ('parse request body', f"{len(request_body)} B",
+         lambda: json.loads(request_body), lambda: fast_json.loads(request_body)),
+        ('bedrock request body', f"{len(old_request_body())} B",
+         old_request_body, lambda: fast_json.anthropic_request_body(500, prompt.system, prompt.messages)),
+        ('parse stream chunks', f"{len(chunk_bytes)} chunks",
+         lambda: [json.loads(chunk) for chunk in chunk_bytes],
+         lambda: [fast_json.loads(chunk) for chunk in chunk_bytes]),
+        ('response payload', f"{len(json.dumps(response))} B",
+         lambda: json.dumps(response), lambda: fast_json.dumps(response)),
+    ]
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    iterations = int(args[0]) if args else 2000
+
+    print("⏱️  JSON SERIALIZATION BENCHMARK")
+    print("=" * 72)
+    print(f"Backend: {fast_json.BACKEND}   iterations: {iterations}")
+    print("-" * 72)
+    print(f"{'payload':<22}{'size':>12}{'stdlib µs':>12}{'fast µs':>12}{'speedup':>10}")
+
+    payloads = make_payloads()
+    # Both paths must produce the same document
+    assert json.loads(fast_json.anthropic_request_body(500, payloads[1].system, payloads[1].messages)) == \
+        json.loads(cases(*payloads)[1][2]())
+
+    total_old = total_new = 0.0
+    for name, size, old, new in cases(*payloads):
+        old_us = min(timeit.repeat(old, number=iterations, repeat=3)) / iterations * 1e6
+        new_us = min(timeit.repeat(new, number=iterations, repeat=3)) / iterations * 1e6
+        total_old += old_us
+        total_new += new_us
+        print(f"{name:<22}{size:>12}{old_us:>12.1f}{new_us:>12.1f}{old_us / new_us:>9.1f}x")
+
+    print("-" * 72)
+    print(f"✅ Per turn: {total_old:.1f} µs -> {total_new:.1f} µs "
+          f"({total_old - total_new:.1f} µs saved, {total_old / total_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Cold vs Warm Agent Initialization Benchmark
+Compares building the agent and its boto3 clients on every request (the old
+lambda_handler behaviour) against reusing the container-wide agent.
+No AWS calls are made - client creation does not need credentials.
+Every agent gets a throwaway outbox and spool and is closed after timing,
+so pending alerts or events on the real directories are never replayed.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import aws_clients
+import mental_health_agent_with_memory as agent_module
+
+
+def _touch_clients(agent):
+    """Force the clients a chat turn needs to exist"""
+    agent.bedrock
+    agent.agentcore
+
+
+def time_cold(iterations):
+    """Per-request construction: fresh agent and fresh clients every time"""
+    samples = []
+    for _ in range(iterations):
+        aws_clients.reset_clients()
+        agent_module._agent = None
+        start = time.perf_counter()
+        agent = agent_module.get_agent()
+        _touch_clients(agent)
+        agent.ses  # the old constructor always built SES too
+        samples.append((time.perf_counter() - start) * 1000)
+        agent.close()
+    agent_module._agent = None
+    return samples
+
+
+def time_warm(iterations):
+    """Warm container: agent and clients already exist"""
+    agent_module.get_agent()
+    _touch_clients(agent_module.get_agent())
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        agent = agent_module.get_agent()
+        _touch_clients(agent)
+        samples.append((time.perf_counter() - start) * 1000)
+    agent_module.get_agent().close()
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<6} mean {statistics.mean(samples):9.3f} ms   "
+          f"p50 {statistics.median(samples):9.3f} ms   p95 {p95:9.3f} ms")
+    return statistics.mean(samples)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    scratch = tempfile.mkdtemp(prefix='warm-start-')
+    os.environ['ALERT_OUTBOX_DIR'] = os.path.join(scratch, 'alerts')
+    os.environ['EVENT_SPOOL_DIR'] = os.path.join(scratch, 'events')
+
+    print("⏱️  AGENT INITIALIZATION BENCHMARK")
+    print("=" * 60)
+    print(f"Iterations: {iterations}")
+
+    cold = report("cold", time_cold(iterations))
+    warm = report("warm", time_warm(iterations))
+
+    print("-" * 60)
+    print(f"✅ Saved per request: {cold - warm:.3f} ms ({cold / max(warm, 1e-6):.0f}x faster when warm)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Concurrent Load Test for the Chat Pipeline
+Simulates N actors, each working through M sessions of scripted multi-turn
+conversation, and reports throughput plus p50/p95/p99 for every pipeline
+stage (taken from the Server-Timing header) and for the whole request.
+
+By default requests go through lambda_handler in-process against the local
+AWS stand-ins; pass --url to drive a deployed endpoint over HTTP instead.
+Results can be saved as JSON and compared against a stored baseline - any
+regression beyond the tolerance exits non-zero.
+
+    python load_test_chat.py --actors 50 --sessions 3 --output results.json
+    python load_test_chat.py --actors 50 --sessions 3 --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from latency_metrics import LatencyHistogram, StageLatencyRecorder
+
+# Multi-turn scripts; each session replays one of them in order
+CONVERSATION_SCRIPTS = [
+    [
+        "Hi, I've been feeling really stressed about work lately",
+        "My manager keeps piling on deadlines and I can't keep up",
+        "I haven't been sleeping well because of it",
+        "What can I do to wind down in the evenings?",
+        "Thanks, I'll try the breathing exercise tonight",
+    ],
+    [
+        "I feel lonely since I moved to a new city",
+        "I don't really know anyone here yet",
+        "I used to play football back home",
+        "Maybe I could look for a local club",
+    ],
+    [
+        "I'm anxious about my exams next week",
+        "Every time I sit down to study my mind goes blank",
+        "My parents expect me to get top grades",
+        "I feel like I'm going to let everyone down",
+        "How do I stop panicking when I open the book?",
+        "Okay, short study blocks sounds doable",
+    ],
+    [
+        "Things have been really dark lately",
+        "I feel hopeless and I don't see the point anymore",
+        "Sometimes I think everyone would be better off without me",
+        "I don't know who to talk to",
+    ],
+]
+
+# How far a metric may move the wrong way before it counts as a regression
+DEFAULT_TOLERANCE = 0.20
+
+
+class LoadTestResults:
+    def __init__(self):
+        self.stages = StageLatencyRecorder()
+        self.request = LatencyHistogram()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.status_counts = {}
+
+    def record(self, status, elapsed_ms, stage_timings):
+        with self.lock:
+            self.requests += 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status != 200:
+                self.errors += 1
+                return
+            self.request.record(elapsed_ms)
+        self.stages.record(stage_timings)
+
+
+def parse_server_timing(header):
+    """'crisis;dur=0.1, context;dur=72.9' -> {'crisis': 0.1, 'context': 72.9}"""
+    timings = {}
+    for entry in (header or '').split(','):
+        name, _, params = entry.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur' and name:
+                timings[name] = float(value)
+    return timings
+
+
+# Transports
+
+class InProcessTransport:
+    """Call lambda_handler directly, backed by the local AWS stand-ins"""
+
+    def __init__(self, latency_profile, throttle_rate, error_rate):
+        import local_aws
+
+        scratch = tempfile.mkdtemp(prefix='load-test-')
+        os.environ.setdefault('EVENT_SPOOL_DIR', os.path.join(scratch, 'events'))
+        os.environ.setdefault('ALERT_OUTBOX_DIR', os.path.join(scratch, 'alerts'))
+        os.environ.setdefault('EMIT_EMF_METRICS', 'false')
+
+        faults = local_aws.FaultInjector(throttle_rate=throttle_rate, error_rate=error_rate)
+        self.services = local_aws.install_local_services(latency_profiles(latency_profile), faults)
+
+        import mental_health_agent_with_memory as agent_module
+        self.agent_module = agent_module
+
+    def post(self, payload, stream):
+        if stream:
+            payload = {**payload, 'stream': True}
+        response = self.agent_module.lambda_handler(
+            {'httpMethod': 'POST', 'headers': {}, 'body': json.dumps(payload)}, None)
+        return response['statusCode'], response['headers'].get('Server-Timing', '')
+
+    def close(self):
+        agent = self.agent_module.get_agent()
+        if agent.event_buffer:
+            agent.event_buffer.flush()
+
+
+class HttpTransport:
+    """POST to a deployed endpoint (API Gateway, Function URL, container)"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+
+    def post(self, payload, stream):
+        headers = {'Content-Type': 'application/json'}
+        if stream:
+            payload = {**payload, 'stream': True}
+            headers['Accept'] = 'text/event-stream'
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'),
+                                         headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            return e.code, ''
+        except (urllib.error.URLError, OSError):
+            return 0, ''
+
+    def close(self):
+        pass
+
+
+def latency_profiles(name):
+    """Latency models for the local stand-ins: production, fast or none"""
+    import local_aws
+
+    if name == 'production':
+        return None
+    if name == 'none':
+        return {operation: local_aws.NO_LATENCY for operation in local_aws.DEFAULT_LATENCY}
+    if name == 'fast':
+        # Same shapes at a tenth of the scale, for quick CI runs
+        return {
+            'invoke_model': local_aws.LatencyModel.lognormal(180, 0.35),
+            'invoke_model_with_response_stream': local_aws.LatencyModel.lognormal(45, 0.35),
+            'create_event': local_aws.LatencyModel.lognormal(6, 0.5),
+            'list_events': local_aws.LatencyModel.lognormal(7, 0.5),
+            'retrieve_memories': local_aws.LatencyModel.lognormal(18, 0.6),
+            'send_email': local_aws.LatencyModel.lognormal(9, 0.4),
+        }
+    raise ValueError(f"Unknown latency profile: {name}")
+
+
+# Load generation
+
+def run_actor(transport, results, actor_index, sessions, stream, think_time):
+    actor_id = f"loadtest-actor-{actor_index}-{uuid.uuid4().hex[:6]}"
+    for session_index in range(sessions):
+        session_id = str(uuid.uuid4())
+        script = CONVERSATION_SCRIPTS[(actor_index + session_index) % len(CONVERSATION_SCRIPTS)]
+        for message in script:
+            payload = {'input': message, 'userId': actor_id, 'sessionId': session_id}
+            start = time.perf_counter()
+            status, server_timing = transport.post(payload, stream)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results.record(status, elapsed_ms, parse_server_timing(server_timing))
+            if think_time:
+                time.sleep(think_time)
+        transport.post({'action': 'end_session', 'userId': actor_id, 'sessionId': session_id}, False)
+
+
+def run_load(transport, actors, sessions, stream, think_time, quiet):
+    results = LoadTestResults()
+    # The agent logs every turn; at hundreds of turns a second that drowns the report
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    start = time.perf_counter()
+    with output:
+        with ThreadPoolExecutor(max_workers=actors, thread_name_prefix='actor') as pool:
+            futures = [pool.submit(run_actor, transport, results, i, sessions, stream, think_time)
+                       for i in range(actors)]
+            for future in futures:
+                future.result()
+        transport.close()
+    duration = time.perf_counter() - start
+    return results, duration
+
+
+def summarize(results, duration, config):
+    stages = results.stages.snapshot()
+    request = results.request.to_dict()
+    return {
+        'config': config,
+        'duration_seconds': round(duration, 2),
+        'requests': results.requests,
+        'errors': results.errors,
+        'error_rate': round(results.errors / results.requests, 4) if results.requests else 0.0,
+        'status_counts': {str(status): count for status, count in sorted(results.status_counts.items())},
+        'throughput_rps': round(results.requests / duration, 2) if duration else 0.0,
+        'request': request,
+        'stages': stages,
+        # Little's law: concurrent executions needed = arrival rate x time in system
+        'concurrency_per_rps': round(request['mean_ms'] / 1000, 3)
+    }
+
+
+def print_report(summary, target_rps):
+    print("-" * 78)
+    print(f"Requests: {summary['requests']}   errors: {summary['errors']} "
+          f"({summary['error_rate'] * 100:.1f}%)   duration: {summary['duration_seconds']}s   "
+          f"throughput: {summary['throughput_rps']} req/s")
+    print("-" * 78)
+    print(f"{'stage':<14}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>12}")
+    rows = list(summary['stages'].items()) + [('request', summary['request'])]
+    for stage, stats in rows:
+        print(f"{stage:<14}{stats['count']:>8}{stats['mean_ms']:>10.1f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>12.1f}")
+    print("-" * 78)
+    if target_rps:
+        mean_needed = target_rps * summary['concurrency_per_rps']
+        p95_needed = target_rps * summary['request']['p95_ms'] / 1000
+        print(f"📐 Provisioned concurrency for {target_rps} req/s: "
+              f"{mean_needed:.0f} (mean latency), {p95_needed:.0f} (p95 latency)")
+
+
+# Baseline comparison
+
+def compare_to_baseline(summary, baseline, tolerance):
+    """Return a list of human-readable regressions (empty when within tolerance)"""
+    regressions = []
+    if summary['throughput_rps'] < baseline['throughput_rps'] * (1 - tolerance):
+        regressions.append(f"throughput {summary['throughput_rps']} req/s < baseline "
+                           f"{baseline['throughput_rps']} req/s")
+    if summary['error_rate'] > baseline['error_rate'] + tolerance / 10:
+        regressions.append(f"error rate {summary['error_rate']:.2%} > baseline {baseline['error_rate']:.2%}")
+
+    current = dict(summary['stages'], request=summary['request'])
+    previous = dict(baseline['stages'], request=baseline['request'])
+    for stage, before in previous.items():
+        after = current.get(stage)
+        if after is None:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            # Ignore sub-millisecond stages; their noise dwarfs any real change
+            if after[key] > max(before[key], 1.0) * (1 + tolerance):
+                regressions.append(f"{stage} {key[:-3]} {after[key]:.1f}ms > baseline {before[key]:.1f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for chat_with_memory")
+    parser.add_argument('--actors', type=int, default=20, help="concurrent simulated users")
+    parser.add_argument('--sessions', type=int, default=2, help="sessions per actor")
+    parser.add_argument('--url', help="HTTP endpoint; omit to run lambda_handler in-process")
+    parser.add_argument('--stream', action='store_true', help="request SSE streaming responses")
+    parser.add_argument('--think-time', type=float, default=0.0, help="seconds between turns")
+    parser.add_argument('--latency-profile', default='fast', choices=['production', 'fast', 'none'],
+                        help="local stand-in latency (in-process only)")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="injected throttling share")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="injected service error share")
+    parser.add_argument('--timeout', type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument('--target-rps', type=float, help="size provisioned concurrency for this rate")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="compare against this results JSON")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed regression as a fraction (default 0.2)")
+    parser.add_argument('--verbose', action='store_true', help="keep the agent's own logging")
+    args = parser.parse_args()
+
+    config = {
+        'actors': args.actors,
+        'sessions': args.sessions,
+        'mode': 'http' if args.url else 'in-process',
+        'stream': args.stream,
+        'think_time': args.think_time,
+        'latency_profile': None if args.url else args.latency_profile,
+        'throttle_rate': args.throttle_rate,
+        'error_rate': args.error_rate
+    }
+
+    print("🏋️  CHAT PIPELINE LOAD TEST")
+    print("=" * 78)
+    print(f"Actors: {args.actors}   sessions/actor: {args.sessions}   mode: {config['mode']}"
+          f"{'   streaming' if args.stream else ''}")
+
+    if args.url:
+        transport = HttpTransport(args.url, args.timeout)
+    else:
+        transport = InProcessTransport(args.latency_profile, args.throttle_rate, args.error_rate)
+
+    results, duration = run_load(transport, args.actors, args.sessions, args.stream,
+                                 args.think_time, quiet=not args.verbose)
+    summary = summarize(results, duration, config)
+    print_report(summary, args.target_rps)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print(f"⚠️  Baseline was recorded with a different configuration: {baseline.get('config')}")
+        regressions = compare_to_baseline(summary, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ REGRESSION against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
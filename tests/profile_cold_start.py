@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cold-Start Profiler
+Starts fresh interpreters that import the Lambda handler module and serve
+requests against the local AWS stand-ins, the way a new container does,
+and reports:
+
+  - per-module import cost (python -X importtime), grouped by top-level package
+  - time to first response for a cold container whose first request is a
+    CORS preflight, and one whose first request is a chat turn
+  - the warm chat turn that follows
+
+Both import modes are measured: lazy (the default, boto3 loaded on first
+use) and eager (LAZY_IMPORTS=false, boto3 loaded at import). The stand-ins
+never build a boto3 client, so in lazy mode the boto3 import a real first
+chat turn would pay is timed separately and added as "+ boto3".
+
+    python profile_cold_start.py [runs] [--top N]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# Runs inside the fresh interpreter; prints one JSON line of timings (ms)
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import mental_health_agent_with_memory as handler_module
+imported = time.perf_counter()
+
+def ms(since):
+    return round((time.perf_counter() - since) * 1000, 2)
+
+chat = {'httpMethod': 'POST', 'body': json.dumps({'input': 'Hi, rough day today', 'userId': 'profile-user',
+                                                   'sessionId': 'profile-session'})}
+timings = {'import': round((imported - start) * 1000, 2)}
+if sys.argv[1] == 'options':
+    handler_module.lambda_handler({'httpMethod': 'OPTIONS'}, None)
+    timings['first_response'] = ms(start)
+    timings['boto3_loaded'] = 'boto3' in sys.modules
+else:
+    handler_module.lambda_handler(chat, None)
+    timings['first_response'] = ms(start)
+    began = time.perf_counter()
+    handler_module.lambda_handler(chat, None)
+    timings['warm_response'] = ms(began)
+    began = time.perf_counter()
+    import aws_clients
+    aws_clients.preload()
+    timings['deferred_boto3'] = ms(began)
+print('COLD_START_PROFILE ' + json.dumps(timings))
+"""
+
+# Only start-up cost is of interest, so the stand-ins answer instantly
+NO_SERVICE_LATENCY = json.dumps({operation: {'type': 'constant', 'ms': 0} for operation in (
+    'invoke_model', 'invoke_model_with_response_stream', 'create_event', 'list_events', 'retrieve_memories'
+)})
+
+MODES = {
+    'lazy': {'LAZY_IMPORTS': 'true'},
+    'eager': {'LAZY_IMPORTS': 'false'}
+}
+
+
+def run_child(first_request, mode_env, importtime=False):
+    env = dict(os.environ, USE_LOCAL_AWS='true', EMIT_EMF_METRICS='false', PREWARM_CONNECTIONS='false',
+               WRITE_BEHIND_EVENTS='false', LOCAL_AWS_LATENCY=NO_SERVICE_LATENCY, **mode_env)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD, first_request]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120)
+    timings = None
+    for line in completed.stdout.splitlines():
+        if line.startswith('COLD_START_PROFILE '):
+            timings = json.loads(line[len('COLD_START_PROFILE '):])
+    if timings is None:
+        raise RuntimeError(f"profile run failed:\n{completed.stderr[-2000:]}")
+    return timings, completed.stderr
+
+
+def import_costs(stderr):
+    """Self time (ms) per top-level package from -X importtime output"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return packages
+
+
+def median(samples, key):
+    values = [sample[key] for sample in samples if key in sample]
+    return statistics.median(values) if values else 0.0
+
+
+def main():
+    args = sys.argv[1:]
+    top = 12
+    if '--top' in args:
+        index = args.index('--top')
+        top = int(args[index + 1])
+        del args[index:index + 2]
+    runs = int(args[0]) if args else 5
+
+    print("🧊 COLD-START PROFILE")
+    print("=" * 72)
+    print(f"Fresh interpreters per scenario: {runs}   Python {sys.version.split()[0]}")
+
+    for mode, mode_env in MODES.items():
+        _, stderr = run_child('options', mode_env, importtime=True)
+        costs = sorted(import_costs(stderr).items(), key=lambda item: item[1], reverse=True)
+        print("-" * 72)
+        print(f"Import cost by package ({mode}, ms self time; {sum(c for _, c in costs):.1f} ms total)")
+        for package, cost in costs[:top]:
+            print(f"  {package:<40}{cost:>10.1f}")
+
+    print("-" * 72)
+    print(f"{'mode':<8}{'import':>10}{'OPTIONS first':>16}{'POST first':>14}{'+ boto3':>10}{'warm POST':>12}")
+    results = {}
+    for mode, mode_env in MODES.items():
+        options = [run_child('options', mode_env)[0] for _ in range(runs)]
+        chat = [run_child('chat', mode_env)[0] for _ in range(runs)]
+        # Eager mode already paid for boto3 at import; preload() is then a no-op
+        deferred = median(chat, 'deferred_boto3') if mode == 'lazy' else 0.0
+        results[mode] = {
+            'import': median(options, 'import'),
+            'options_first': median(options, 'first_response'),
+            'post_first': median(chat, 'first_response') + deferred,
+            'warm': median(chat, 'warm_response')
+        }
+        boto3_on_preflight = any(sample['boto3_loaded'] for sample in options)
+        print(f"{mode:<8}{results[mode]['import']:>10.1f}{results[mode]['options_first']:>16.1f}"
+              f"{results[mode]['post_first']:>14.1f}{deferred:>10.1f}{results[mode]['warm']:>12.1f}"
+              + ("   (boto3 loaded for preflight)" if boto3_on_preflight else ""))
+
+    print("-" * 72)
+    saved = results['eager']['options_first'] - results['lazy']['options_first']
+    print(f"✅ Lazy imports answer a cold preflight {saved:.1f} ms sooner "
+          f"({results['eager']['options_first']:.1f} -> {results['lazy']['options_first']:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
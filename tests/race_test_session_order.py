@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Session Ordering Race Test
+Sends a burst of messages into one session at almost the same moment, the
+way a user who types fast does, and checks against the local AWS
+stand-ins that:
+
+  - every turn saw the replies of all turns sent before it
+  - the session's stored events are in send order, USER then ASSISTANT
+  - turns of different sessions still run in parallel
+  - in the container server, a turn waiting behind its own session holds
+    no turn slot: with two slots, a burst into session X followed by one
+    message to session Y serves Y in about one turn
+  - no lock entries are left behind once the sessions go quiet
+
+The unordered path (the pipeline without the session lock) is run first
+for comparison.
+
+    python race_test_session_order.py [messages]
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+# Sends are this far apart, so the arrival order is well defined
+STAGGER_SECONDS = 0.01
+MODEL_SECONDS = 0.2
+
+
+def burst(agent, actor_id, session_id, count, ordered):
+    """Send count messages into one session from count threads; results in send order"""
+    def send(index):
+        time.sleep(index * STAGGER_SECONDS)
+        message = f"Quick message number {index}"
+        if ordered:
+            return agent.chat_with_memory(message, actor_id, session_id)
+        return agent._chat_turn(message, actor_id, session_id, None, 0)
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(send, range(count)))
+
+
+async def post(port, payload):
+    """One request on its own connection; returns the seconds until the reply arrived"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(b'POST /invocations HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                 b'Connection: close\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    return time.perf_counter() - start
+
+
+async def server_burst(agent, count):
+    """count messages into session X, then one into Y, through a server with two turn slots"""
+    from agentcore_server import AgentCoreServer
+
+    server = AgentCoreServer(agent=agent, max_concurrency=2)
+    await server.start('127.0.0.1', 0)
+    port = server.server.sockets[0].getsockname()[1]
+
+    async def send(index, session):
+        await asyncio.sleep(index * STAGGER_SECONDS)
+        return await post(port, {'input': f"Quick message number {index}", 'actorId': 'race-server',
+                                 'sessionId': session})
+
+    sends = [send(i, 'race-server-x') for i in range(count)] + [send(count, 'race-server-y')]
+    elapsed = await asyncio.gather(*sends)
+    await server.drain(5)
+    return elapsed, server.session_turns.stats()
+
+
+def stored_user_messages(services, agent, actor_id, session_id):
+    if agent.event_buffer:
+        agent.event_buffer.flush()
+    response = services['bedrock-agentcore'].list_events(
+        memoryId=agent.memory_id, actorId=actor_id, sessionId=session_id, maxResults=100)
+    messages = [message for event in reversed(response['events']) for message in event['messages']]
+    return [text for text, role in messages if role == 'USER'], [role for _, role in messages]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    scratch = tempfile.mkdtemp(prefix='race-test-')
+    os.environ.setdefault('EVENT_SPOOL_DIR', os.path.join(scratch, 'events'))
+    os.environ.setdefault('ALERT_OUTBOX_DIR', os.path.join(scratch, 'alerts'))
+    os.environ.setdefault('EMIT_EMF_METRICS', 'false')
+    os.environ.setdefault('SESSION_SUMMARIES', 'false')
+
+    import local_aws
+    services = local_aws.install_local_services({
+        'invoke_model': local_aws.LatencyModel.constant(MODEL_SECONDS * 1000),
+        'create_event': local_aws.LatencyModel.constant(5),
+        'list_events': local_aws.LatencyModel.constant(5),
+        'retrieve_memories': local_aws.LatencyModel.constant(5),
+    })
+    import mental_health_agent_with_memory as agent_module
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = agent_module.get_agent()
+
+    print("🔀 SESSION ORDERING RACE TEST")
+    print("=" * 72)
+    print(f"Messages per burst: {count}   model latency: {MODEL_SECONDS * 1000:.0f} ms")
+    print("-" * 72)
+
+    failed = False
+    expected = [f"Quick message number {i}" for i in range(count)]
+    for label, ordered in (('unordered', False), ('ordered', True)):
+        actor_id, session_id = f'race-{label}', f'race-{label}-session'
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = burst(agent, actor_id, session_id, count, ordered)
+            users, roles = stored_user_messages(services, agent, actor_id, session_id)
+        elapsed = time.perf_counter() - start
+
+        context_seen = [result['context_used'] for result in results]
+        in_order = users == expected and roles == ['USER', 'ASSISTANT'] * count
+        saw_history = context_seen == [2 * i for i in range(count)]
+        print(f"{label:<10} {elapsed:6.2f}s   context per turn {context_seen}   "
+              f"stored in send order: {'yes' if in_order else 'no'}")
+        if ordered and not (in_order and saw_history):
+            failed = True
+
+    # Different sessions must not wait on each other
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=count) as pool:
+            list(pool.map(lambda i: agent.chat_with_memory("Hello", f'parallel-{i}', f'parallel-{i}'),
+                          range(count)))
+    parallel = time.perf_counter() - start
+    print(f"{'parallel':<10} {parallel:6.2f}s   {count} sessions, one turn each")
+    if parallel > 2 * MODEL_SECONDS + 0.5:
+        print("❌ Separate sessions were serialized")
+        failed = True
+
+    # Through the server: X's queued turns must not hold Y out of a slot
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed, server_locks = asyncio.run(server_burst(agent, count))
+    x_done, y_done = max(elapsed[:-1]), elapsed[-1]
+    print(f"{'server':<10} {x_done:6.2f}s   {count} turns in X, 2 slots; Y answered in {y_done:.2f}s")
+    if y_done > 3 * MODEL_SECONDS:
+        print("❌ Session Y waited behind session X's queued turns")
+        failed = True
+    if server_locks['active_sessions']:
+        print("❌ Server left session entries behind")
+        failed = True
+
+    stats = agent.session_locks.stats()
+    print("-" * 72)
+    print(f"Session locks: {stats}")
+    if stats['active_sessions']:
+        print("❌ Lock entries left behind for idle sessions")
+        failed = True
+    if failed:
+        print("❌ Turns in one session raced")
+        sys.exit(1)
+    print("✅ Turns in a session ran in send order; separate sessions ran in parallel")
+
+
+if __name__ == "__main__":
+    main()
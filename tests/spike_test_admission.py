@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Traffic Spike Test for Priority Admission
+Starts the container server in-process on the local AWS stand-ins with a
+small concurrency limit, fires one burst of mostly small-talk turns mixed
+with MODERATE and HIGH-risk messages, and reports per risk level how many
+turns were served or shed and how long they queued.
+
+Fails (exit 1) if any HIGH or MODERATE turn is shed, or if HIGH turns
+queued longer than LOW ones at p95.
+
+    python spike_test_admission.py [--burst 300] [--concurrency 8] [--shed-depth 32]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+MESSAGES = {
+    'LOW': "Hi, how are you today?",
+    'MODERATE': "I've been so anxious and overwhelmed this week",
+    'HIGH': "I feel hopeless and I want to die",
+}
+
+# One HIGH and two MODERATE turns in every twenty
+MIX = ['LOW'] * 17 + ['MODERATE'] * 2 + ['HIGH']
+
+
+async def post(port, payload):
+    """One request on its own connection; returns (status, body dict, Server-Timing)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(b'POST /invocations HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                 b'Connection: close\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = {line.split(':', 1)[0].lower(): line.split(':', 1)[1].strip() for line in head[1:] if ':' in line}
+    data = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return int(head[0].split(' ')[1]), json.loads(data), headers.get('server-timing', '')
+
+
+def queue_ms(server_timing):
+    for part in server_timing.split(','):
+        name, _, duration = part.strip().partition(';dur=')
+        if name == 'queue':
+            return float(duration)
+    return 0.0
+
+
+def p95(values):
+    values = sorted(values)
+    return values[max(int(len(values) * 0.95) - 1, 0)] if values else 0.0
+
+
+async def run(args):
+    import local_aws
+    from agentcore_server import AgentCoreServer
+
+    local_aws.install_local_services({
+        'invoke_model': local_aws.LatencyModel.lognormal(150, 0.3),
+        'create_event': local_aws.LatencyModel.constant(5),
+        'list_events': local_aws.LatencyModel.constant(5),
+        'retrieve_memories': local_aws.LatencyModel.constant(10),
+    })
+    server = AgentCoreServer(max_concurrency=args.concurrency, shed_queue_depth=args.shed_depth)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await server.start('127.0.0.1', 0)
+    port = server.server.sockets[0].getsockname()[1]
+
+    levels = [MIX[i % len(MIX)] for i in range(args.burst)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(
+            post(port, {'input': MESSAGES[level], 'actorId': f'spike-{i}', 'sessionId': f'spike-{i}'})
+            for i, level in enumerate(levels)
+        ))
+        await server.drain(5)
+    return levels, results, server.admission.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--burst', type=int, default=300, help="concurrent turns in the spike")
+    parser.add_argument('--concurrency', type=int, default=8, help="turns admitted at once")
+    parser.add_argument('--shed-depth', type=int, default=32, help="queue depth at which LOW turns are shed")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='spike-test-')
+    os.environ.setdefault('EVENT_SPOOL_DIR', os.path.join(scratch, 'events'))
+    os.environ.setdefault('ALERT_OUTBOX_DIR', os.path.join(scratch, 'alerts'))
+    os.environ.setdefault('EMIT_EMF_METRICS', 'false')
+
+    levels, results, stats = asyncio.run(run(args))
+
+    print("🚦 PRIORITY ADMISSION SPIKE TEST")
+    print("=" * 72)
+    print(f"Burst: {args.burst}   concurrency: {args.concurrency}   shed depth: {args.shed_depth}")
+    print("-" * 72)
+    print(f"{'risk':<10}{'turns':>8}{'served':>8}{'shed':>8}{'queue p50 ms':>16}{'queue p95 ms':>16}")
+
+    waits = {}
+    failed = False
+    for level in ('HIGH', 'MODERATE', 'LOW'):
+        mine = [result for result, lvl in zip(results, levels) if lvl == level]
+        shed = [body for status, body, _ in mine if body.get('shed')]
+        waits[level] = [queue_ms(timing) for status, body, timing in mine if status == 200 and not body.get('shed')]
+        print(f"{level:<10}{len(mine):>8}{len(mine) - len(shed):>8}{len(shed):>8}"
+              f"{statistics.median(waits[level]) if waits[level] else 0.0:>16.1f}{p95(waits[level]):>16.1f}")
+        if shed and level != 'LOW':
+            print(f"❌ {len(shed)} {level} turns were shed")
+            failed = True
+
+    print("-" * 72)
+    print(f"Admission stats: admitted {stats['admitted']}, shed {stats['shed']}")
+    if p95(waits['HIGH']) > p95(waits['LOW']):
+        print("❌ HIGH-risk turns queued longer than LOW-risk turns")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ No crisis traffic shed; HIGH-risk turns went to the front of the queue")
+
+
+if __name__ == "__main__":
+    main()